@@ -1,115 +1,372 @@
 import io
 import os
-from flask import Flask, request, jsonify
+import json
+import time
+import logging
+import sqlite3
+from flask import Flask, request, Response, g
+from werkzeug.exceptions import RequestEntityTooLarge
 from flask_cors import CORS
-import re
 import sys
-import requests
-from datetime import datetime
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, timedelta
+from ocr_cache import setup_cache, cached_ocr
+import ocr_jobs
+import ocr_engine
+from ocr_backends import get_backend, OcrError
+from admission import AdmissionGate, RateLimiter, Overloaded
+import metrics
+import profiling
+from receipt_parser import find_total
+from image_preprocessing import prepare_for_ocr
+from uploads import upload_view, UploadTooLarge, MAX_UPLOAD_BYTES
+from CRUD import (setup_database, get_totals, get_date_range, pick_bucket, BUCKETS, load_expenses,
+                  count_expenses, save_expense, save_expenses_bulk, get_expenses_version,
+                  get_period_summary, is_valid_date, is_valid_amount)
 
-# You would install and import the Google Cloud Vision library here if you were
-# running this on a server.
-# from google.cloud import vision_v1 as vision
-# from google.protobuf.json_format import MessageToJson
+# orjson serializes large responses several times faster than the json module.
+# It is optional; without it responses fall back to compact json.dumps.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Log level is set with LOG_LEVEL; per-request lines are logged at INFO and
+# per-step detail at DEBUG.
+logging.basicConfig(
+    level=os.environ.get("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger("receipt_api")
 
 # Create an instance of the Flask class
 app = Flask(__name__)
-# Enable CORS for the frontend to be able to communicate with this API
-CORS(app)
+# Enable CORS for the frontend to be able to communicate with this API.
+# The ETag header is exposed so the dashboard can send it back in If-None-Match.
+CORS(app, expose_headers=["ETag"])
+
+# Upload limits. Requests larger than MAX_REQUEST_BYTES are refused by Flask
+# before the body is read; single receipts are capped at MAX_UPLOAD_BYTES.
+MAX_REQUEST_BYTES = int(os.environ.get("MAX_REQUEST_BYTES", 200 * 1024 * 1024))
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+# Allowance for the multipart headers around a single uploaded file.
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+# Admission control for receipt OCR. At most OCR_MAX_IN_FLIGHT receipts are
+# recognized at once by synchronous requests and async job workers together.
+# OCR_MAX_WAITING more requests may wait up to OCR_WAIT_TIMEOUT seconds and the
+# rest get a 503 with Retry-After; job workers wait for a slot as long as it
+# takes. Batch requests and job event streams have their own limits below.
+# The server's thread count must stay above all of these together
+# (OCR_MAX_IN_FLIGHT + OCR_MAX_WAITING + BATCH_MAX_REQUESTS +
+# JOB_EVENTS_MAX_STREAMS, see gunicorn.conf.py) so cheap endpoints always have
+# a thread free.
+OCR_MAX_IN_FLIGHT = int(os.environ.get("OCR_MAX_IN_FLIGHT", 4))
+OCR_MAX_WAITING = int(os.environ.get("OCR_MAX_WAITING", 4))
+OCR_WAIT_TIMEOUT = float(os.environ.get("OCR_WAIT_TIMEOUT", 2.0))
+ocr_gate = AdmissionGate(OCR_MAX_IN_FLIGHT, OCR_MAX_WAITING, OCR_WAIT_TIMEOUT)
+# Per-client rate limit for the receipt parsing endpoints, off when 0. Clients
+# are told apart by RATE_LIMIT_CLIENT_HEADER (e.g. X-Forwarded-For behind a
+# proxy, or an API key header) or else by their address.
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("RATE_LIMIT_PER_MINUTE", 0))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", 10))
+RATE_LIMIT_CLIENT_HEADER = os.environ.get("RATE_LIMIT_CLIENT_HEADER")
+rate_limiter = RateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST) if RATE_LIMIT_PER_MINUTE > 0 else None
+
+# Batch parsing settings. The pool is created lazily on the first batch request.
+# Its worker processes cannot share the OCR admission gate above, so the pool
+# size is their own OCR limit; by default it matches the gate's.
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", OCR_MAX_IN_FLIGHT))
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", 500))
+RECEIPT_EXTENSIONS = (".png", ".jpg", ".jpeg")
+batch_executor = None
+# A batch request holds its server thread until every receipt is parsed, so
+# at most BATCH_MAX_REQUESTS run at once; more get a 503 at once.
+BATCH_MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", 2))
+batch_gate = AdmissionGate(BATCH_MAX_REQUESTS, 0, 0)
+# Longest time a job event stream stays open, and how many may be open at
+# once. Each stream holds a server thread, so clients reconnect or poll
+# /api/jobs/<id> after the time limit, and get a 503 beyond the stream limit.
+JOB_EVENTS_MAX_SECONDS = float(os.environ.get("JOB_EVENTS_MAX_SECONDS", 120))
+JOB_EVENTS_MAX_STREAMS = int(os.environ.get("JOB_EVENTS_MAX_STREAMS", 4))
+events_gate = AdmissionGate(JOB_EVENTS_MAX_STREAMS, 0, 0)
+
+# Expense listing page sizes.
+EXPENSES_PAGE_SIZE = 100
+EXPENSES_MAX_PAGE_SIZE = 1000
+
+# Dashboard summaries: how many recent transactions each view lists, and the
+# cached summaries as (view, anchor date) -> (expenses version, data).
+SUMMARY_RECENT_LIMIT = 10
+SUMMARY_CACHE_SIZE = 64
+summary_cache = {}
+
+# The OCR backend is chosen with OCR_BACKEND: "fake" returns a sample receipt,
+# "tesseract" runs the local worker pool and "http" calls OCR_REMOTE_URL.
+ocr_backend = get_backend()
+setup_cache()
+setup_database()
+
+# Stages of a receipt request, timed into STAGE_METRIC and exposed on /metrics.
+STAGE_METRIC = "receipt_stage_seconds"
+metrics.define(STAGE_METRIC, "histogram",
+               "Time spent in each stage of a receipt request "
+               "(upload_read, admission_wait, preprocess, ocr, parse, response_build).")
+metrics.define("http_request_duration_seconds", "histogram", "Time to handle a request, by endpoint.")
+metrics.define("http_requests_total", "counter", "Requests handled, by endpoint, method and status code.")
+metrics.define("receipt_errors_total", "counter", "Receipt requests that failed, by reason.")
 
 def create_response(status, data, message, status_code):
     """
     A helper function to create a standardized JSON response.
     """
-    response = jsonify({
+    body = dumps_json({
         "status": status,
         "data": data,
         "message": message
     })
-    response.status_code = status_code
-    return response
+    return Response(body, status=status_code, mimetype="application/json")
+
+def dumps_json(value):
+    """
+    Serializes a response body to JSON bytes, with orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+def expenses_etag():
+    """
+    Returns the ETag for responses built from the expenses tables. It is the
+    change counter, so it changes with every write and costs one lookup.
+    """
+    return f"expenses-{get_expenses_version()}"
+
+def not_modified(etag):
+    """
+    Returns a 304 response if the request's If-None-Match already has etag,
+    otherwise None. Check it before running the query the response needs.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def invalid_date_params(*values):
+    """
+    Returns True if any of the given query parameters is set but is not a YYYY-MM-DD date.
+    """
+    return any(value and not is_valid_date(value) for value in values)
 
 def get_text_from_image_api(image_data):
     """
-    Simulated call to a cloud-based OCR API.
-    In a real-world scenario, you would send the image data to Google Cloud Vision.
-    """
-    print("Simulating Google Cloud Vision API call...")
-
-    # Here is what a real API call would look like.
-    # We are commenting it out and using a placeholder for now.
-    # try:
-    #     client = vision.ImageAnnotatorClient()
-    #     image = vision.Image(content=image_data)
-    #     response = client.text_detection(image=image)
-    #     texts = response.text_annotations
-    #     if texts:
-    #         return texts[0].description
-    #     else:
-    #         return ""
-    # except Exception as e:
-    #     print(f"Error calling Vision API: {e}")
-    #     return ""
-
-    # Returning a sample receipt text to test the parsing logic
-    return """
-    GROCERY STORE
-    123 Main Street
-    Anytown, USA
-    --------------------
-    Milk                 2.99
-    Bread                3.50
-    Eggs                 4.25
-    Subtotal            10.74
-    Tax                  0.86
-    Total               11.60
-    Credit Card
-    --------------------
+    Returns the OCR text for an uploaded image, reusing the cached result
+    when the same image was recognized before.
     """
+    return cached_ocr(image_data, run_ocr, ocr_backend.version)
+
+def run_ocr(image_data):
+    """
+    Sends an image to the OCR backend, preprocessing it first when the
+    backend needs that.
+    """
+    if ocr_backend.needs_preprocessing:
+        image_data = preprocess_upload(image_data)
+    return ocr_backend.recognize(image_data)
+
+def preprocess_upload(image_data):
+    """
+    Downscales, binarizes and deskews an uploaded image before OCR.
+    Uploads that cannot be decoded as an image are passed through unchanged.
+    """
+    try:
+        with metrics.timed(STAGE_METRIC, stage="preprocess"):
+            processed, timings = prepare_for_ocr(image_data)
+    except (OSError, ValueError) as e:
+        logger.warning("Skipping preprocessing, could not decode image: %s", e)
+        return image_data
+
+    if logger.isEnabledFor(logging.DEBUG):
+        steps = " ".join(f"{step}_ms={seconds * 1000:.1f}" for step, seconds in timings.items())
+        logger.debug("preprocessed bytes_in=%d bytes_out=%d %s", len(image_data), len(processed), steps)
+    return processed
 
 def parse_receipt(text):
     """
     Parses the OCR text from a receipt to find the total amount.
-    It uses a multi-stage approach for better accuracy.
-    """
-    print("--- Parsing Receipt ---")
-    print(f"Original Text:\n{text}\n")
-
-    # Stage 1: The most reliable method. Look for a number directly following a total keyword.
-    total_pattern = re.compile(
-        r'(?:total|grand\s*total|balance\s*due|amount\s*paid|sum|price|charge|total\s*due)\s*[:\-]?\s*(?:\$|RM|MYR|SGD|€)?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
-        re.IGNORECASE
-    )
-    matches = total_pattern.findall(text)
-    if matches:
-        final_total_str = matches[-1].replace(',', '')
-        print(f"Stage 1 (Keyword Match) found: {final_total_str}")
-        try:
-            return float(final_total_str)
-        except ValueError:
-            pass 
-
-    # Stage 2: Find the largest number on the receipt with two decimal places.
-    all_decimal_numbers = re.findall(r'\b\d+\.\d{2}\b', text)
-    if all_decimal_numbers:
-        decimal_floats = [float(n) for n in all_decimal_numbers]
-        largest_decimal = max(decimal_floats)
-        print(f"Stage 2 (Largest Decimal) found: {largest_decimal}")
-        return largest_decimal
-    
-    # Stage 3: The final fallback. Find the largest number on the entire receipt.
-    all_numbers_pattern = re.compile(r'\b\d+\.?\d*\b')
-    numbers = all_numbers_pattern.findall(text)
-    if numbers:
-        cleaned_numbers = [float(n) for n in numbers if float(n) > 1.0]
-        if cleaned_numbers:
-            max_number = max(cleaned_numbers)
-            print(f"Stage 3 (Largest Number Overall) found: {max_number}")
-            return max_number
-
-    print("No total amount could be found.")
+    The shared receipt_parser ranks keyword, currency and plain amounts in one pass.
+    """
+    total, line, source = find_total(text)
+    if total is None:
+        logger.debug("No total amount could be found")
+        return None
+
+    logger.debug("Total %s found by %s match on line: %s", total, source, line)
+    return total
+
+def process_receipt(image_data):
+    """
+    Runs OCR and parsing for one receipt. Used by the batch worker pool,
+    so it returns a plain dict instead of a Flask response.
+    """
+    try:
+        receipt_text = get_text_from_image_api(image_data)
+        total = parse_receipt(receipt_text)
+    except Exception as e:
+        logger.warning("Receipt processing failed: %s", e)
+        return {"status": "error", "total": None, "message": str(e)}
+
+    if total is not None:
+        return {"status": "success", "total": total, "message": "Total found successfully"}
+    return {"status": "error", "total": None, "message": "Could not find a total amount."}
+
+def process_receipt_job(image_data):
+    """
+    Runs an async parse job once it gets an OCR admission slot, so queued
+    jobs and synchronous requests share the OCR_MAX_IN_FLIGHT limit.
+    """
+    ocr_gate.acquire_waiting()
+    started = time.perf_counter()
+    try:
+        return process_receipt(image_data)
+    finally:
+        ocr_gate.release(time.perf_counter() - started)
+
+def get_batch_executor():
+    """
+    Returns the shared process pool for batch parsing, creating it on first use.
+    Workers are not forked from the server: a fork copies locks that other
+    request threads happen to hold (metrics, logging) and can deadlock the child.
+    """
+    global batch_executor
+    if batch_executor is None:
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        batch_executor = ProcessPoolExecutor(
+            max_workers=BATCH_MAX_WORKERS, mp_context=multiprocessing.get_context(start_method)
+        )
+    return batch_executor
+
+def collect_batch_files(uploads):
+    """
+    Expands the uploaded files into a list of (filename, image_data, error)
+    triples, where image_data is None and error says why for files that
+    cannot be parsed. Zip archives are unpacked in place, keeping the order
+    of their entries.
+
+    Every receipt is capped at MAX_UPLOAD_BYTES. Plain files are measured
+    through upload_view before they are read, and zip entries by their
+    declared sizes before anything is decompressed (zipfile never inflates
+    an entry past that size). Raises
+    UploadTooLarge when the batch has more than BATCH_MAX_FILES receipts or
+    unpacks to more than MAX_REQUEST_BYTES.
+    """
+    too_large_message = f"Receipt is larger than {MAX_UPLOAD_BYTES} bytes"
+    items = []
+    unpacked_bytes = 0
+    for upload in uploads:
+        if upload.filename and upload.filename.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(upload.stream) as archive:
+                    entries = [
+                        entry for entry in archive.infolist()
+                        if not entry.is_dir() and entry.filename.lower().endswith(RECEIPT_EXTENSIONS)
+                    ]
+                    if len(items) + len(entries) > BATCH_MAX_FILES:
+                        raise UploadTooLarge(f"Too many receipts, the limit is {BATCH_MAX_FILES}")
+                    for entry in entries:
+                        filename = f"{upload.filename}/{entry.filename}"
+                        if entry.file_size > MAX_UPLOAD_BYTES:
+                            items.append((filename, None, too_large_message))
+                            continue
+                        unpacked_bytes += entry.file_size
+                        if unpacked_bytes > MAX_REQUEST_BYTES:
+                            raise UploadTooLarge(f"Archive unpacks to more than {MAX_REQUEST_BYTES} bytes")
+                        items.append((filename, archive.read(entry), None))
+            except zipfile.BadZipFile:
+                items.append((upload.filename, None, "Not a valid zip archive."))
+        else:
+            if len(items) >= BATCH_MAX_FILES:
+                raise UploadTooLarge(f"Too many receipts, the limit is {BATCH_MAX_FILES}")
+            try:
+                # The pool pickles what it is given, so this is the one copy needed.
+                with upload_view(upload.stream, MAX_UPLOAD_BYTES) as view:
+                    items.append((upload.filename, bytes(view), None))
+            except UploadTooLarge:
+                items.append((upload.filename, None, too_large_message))
+    return items
+
+def log_receipt_request(outcome, timings, **fields):
+    """
+    Logs one key=value line per receipt request with its stage timings.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    parts = [f"outcome={outcome}"]
+    parts += [f"{key}={value}" for key, value in fields.items()]
+    parts += [f"{stage}_ms={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    logger.info("parse-receipt %s", " ".join(parts))
+
+def receipt_error(reason, message, status_code, timings, **fields):
+    """
+    Counts, logs and returns the error response for a failed receipt request.
+    """
+    metrics.increment("receipt_errors_total", reason=reason)
+    log_receipt_request(reason, timings, **fields)
+    return create_response("error", None, message, status_code)
+
+def shed_request(reason, error, status_code, timings):
+    """
+    Returns the error response for a request turned away by admission
+    control, with a Retry-After header.
+    """
+    response = receipt_error(reason, str(error), status_code, timings)
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+def check_rate_limit(timings):
+    """
+    Spends one of the client's rate limit tokens. Returns a 429 response if
+    it has none left, otherwise None.
+    """
+    if rate_limiter is None:
+        return None
+    client = request.headers.get(RATE_LIMIT_CLIENT_HEADER) if RATE_LIMIT_CLIENT_HEADER else None
+    try:
+        rate_limiter.check(client or request.remote_addr)
+    except Overloaded as e:
+        return shed_request("rate_limited", e, 429, timings)
     return None
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Request profiling is opt-in; see profiling.py.
+    if profiling.ADMIN_TOKEN is not None:
+        g.profile = profiling.start_request(request.headers)
+
+@app.teardown_request
+def finish_request_profile(error):
+    session = g.pop("profile", None)
+    if session is not None:
+        profiling.finish_request(session, request.method, request.path, g.get("response_status", 500))
+
+@app.after_request
+def record_request_metrics(response):
+    g.response_status = response.status_code
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    started = g.get("request_started")
+    if started is not None:
+        metrics.observe("http_request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+    metrics.increment("http_requests_total", endpoint=endpoint, method=request.method, status=response.status_code)
+    return response
+
+@app.errorhandler(413)
+def request_too_large(error):
+    return create_response("error", None, "Upload is too large", 413)
+
 @app.route("/")
 def test():
     now = datetime.now()
@@ -117,22 +374,443 @@ def test():
 
 @app.route("/api/parse-receipt", methods=["POST"])
 def parse_receipt_api():
-    print("Received a new request to parse a receipt.")
-    if "receipt" not in request.files:
-        print("Error: No receipt file provided in the request.")
-        return create_response("error", None, "No receipt file provided", 400) 
-    
+    timings = {}
+    too_large_message = f"Receipt is larger than {MAX_UPLOAD_BYTES} bytes"
+    # Cap this route's body at one receipt, so uploads without a Content-Length
+    # are cut off while werkzeug reads them rather than at MAX_REQUEST_BYTES.
+    request.max_content_length = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+    # Refuse oversized uploads from the declared length, before reading the body.
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+        return receipt_error("too_large", too_large_message, 413, timings, content_length=request.content_length)
+    limited = check_rate_limit(timings)
+    if limited is not None:
+        return limited
+    is_async = request.args.get("async") in ("1", "true")
+    if not is_async:
+        # Shed load before reading the body when the OCR wait queue is already full.
+        try:
+            ocr_gate.check_capacity()
+        except Overloaded as e:
+            return shed_request("overloaded", e, 503, timings)
+
+    # Reading the upload covers multipart parsing, where werkzeug spools the
+    # file to memory or a temporary file; the handlers below read that copy.
+    started = time.perf_counter()
+    try:
+        has_file = "receipt" in request.files
+    except RequestEntityTooLarge:
+        return receipt_error("too_large", too_large_message, 413, timings)
+    if not has_file:
+        return receipt_error("no_file", "No receipt file provided", 400, timings)
+
     receipt_file = request.files["receipt"]
-    image_data = receipt_file.read()
-    receipt_text = get_text_from_image_api(image_data)
-    total = parse_receipt(receipt_text)
+    try:
+        with upload_view(receipt_file.stream) as image_data:
+            timings["upload_read"] = time.perf_counter() - started
+            metrics.observe(STAGE_METRIC, timings["upload_read"], stage="upload_read")
+
+            if is_async:
+                ocr_jobs.start_workers(process_receipt_job)
+                job_id = ocr_jobs.submit_job(image_data)
+                data = {"job_id": job_id, "status_url": f"/api/jobs/{job_id}", "events_url": f"/api/jobs/{job_id}/events"}
+                log_receipt_request("queued", timings, job_id=job_id, bytes=len(image_data))
+                return create_response("success", data, "Receipt queued for parsing", 202)
+
+            upload_bytes = len(image_data)
+            try:
+                with metrics.timed(STAGE_METRIC, timings, stage="admission_wait"):
+                    ocr_gate.acquire()
+            except Overloaded as e:
+                return shed_request("overloaded", e, 503, timings)
+            ocr_started = time.perf_counter()
+            try:
+                with metrics.timed(STAGE_METRIC, timings, stage="ocr"):
+                    receipt_text = get_text_from_image_api(image_data)
+            except OcrError as e:
+                # The OCR service is down or failing; tell JSON clients so.
+                logger.warning("OCR backend failed for a %d byte upload: %s", upload_bytes, e)
+                return receipt_error("ocr_unavailable", "OCR service is unavailable, try again later", 502, timings,
+                                     bytes=upload_bytes)
+            except Exception:
+                metrics.increment("receipt_errors_total", reason="ocr_failed")
+                logger.exception("OCR failed for a %d byte upload", upload_bytes)
+                raise
+            finally:
+                ocr_gate.release(time.perf_counter() - ocr_started)
+    except UploadTooLarge:
+        return receipt_error("too_large", too_large_message, 413, timings)
+
+    with metrics.timed(STAGE_METRIC, timings, stage="parse"):
+        total = parse_receipt(receipt_text)
 
-    if total is not None: 
-        print(f"Total found: {total}. Sending success response.")
-        return create_response("success", {"total": total}, "Total found successfully", 200)
-    else: 
-        print("No total found. Sending error response.")
-        return create_response("error", None, "Could not find a total amount.", 500)
+    if total is None:
+        return receipt_error("no_total", "Could not find a total amount.", 500, timings, bytes=upload_bytes)
+
+    with metrics.timed(STAGE_METRIC, timings, stage="response_build"):
+        response = create_response("success", {"total": total}, "Total found successfully", 200)
+    log_receipt_request("success", timings, bytes=upload_bytes, total=total)
+    return response
+
+@app.route("/api/parse-receipts", methods=["POST"])
+def parse_receipts_api():
+    """
+    Parses many receipts in one request. Accepts several files under the
+    "receipts" field (or a zip of images) and returns one result per image,
+    in upload order. A failed image does not fail the whole batch.
+    """
+    timings = {}
+    limited = check_rate_limit(timings)
+    if limited is not None:
+        return limited
+    # Turn extra batches away before reading their bodies.
+    try:
+        batch_gate.acquire()
+    except Overloaded as e:
+        return shed_request("batch_overloaded", e, 503, timings)
+    started = time.perf_counter()
+    try:
+        return parse_batch()
+    finally:
+        batch_gate.release(time.perf_counter() - started)
+
+def parse_batch():
+    """
+    Parses the receipts of a batch request, see parse_receipts_api.
+    """
+    uploads = request.files.getlist("receipts")
+    if not uploads:
+        return create_response("error", None, "No receipt files provided", 400)
+
+    try:
+        items = collect_batch_files(uploads)
+    except UploadTooLarge as e:
+        return create_response("error", None, str(e), 413)
+    if not items:
+        return create_response("error", None, "No receipt images found in upload", 400)
+
+    executor = get_batch_executor()
+    futures = [
+        executor.submit(process_receipt, image_data) if image_data is not None else None
+        for _, image_data, _ in items
+    ]
+
+    results = []
+    for (filename, _, error), future in zip(items, futures):
+        if future is None:
+            result = {"status": "error", "total": None, "message": error}
+        else:
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"status": "error", "total": None, "message": str(e)}
+        result["filename"] = filename
+        results.append(result)
+
+    failed = sum(1 for result in results if result["status"] != "success")
+    message = f"Parsed {len(results) - failed} of {len(results)} receipts"
+    return create_response("success", {"results": results, "failed": failed}, message, 200)
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job_api(job_id):
+    """
+    Returns the status of an async parse job, with its result once it is done.
+    """
+    job = ocr_jobs.get_job(job_id)
+    if job is None:
+        return create_response("error", None, "Unknown job id", 404)
+    return create_response("success", job, f"Job is {job['status']}", 200)
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events_api(job_id):
+    """
+    Streams status updates for an async parse job as server-sent events
+    and closes the stream when the job has finished. After
+    JOB_EVENTS_MAX_SECONDS a "timeout" event is sent and the stream closes.
+    """
+    if ocr_jobs.get_job(job_id) is None:
+        return create_response("error", None, "Unknown job id", 404)
+    try:
+        events_gate.acquire()
+    except Overloaded as e:
+        response = create_response("error", None, "Too many open job event streams", 503)
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    opened = time.perf_counter()
+
+    def stream():
+        last_status = None
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while True:
+            job = ocr_jobs.get_job(job_id)
+            if job is None:
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: {last_status}\ndata: {json.dumps(job)}\n\n"
+            if last_status in ("done", "failed"):
+                return
+            if time.monotonic() >= deadline:
+                yield f"event: timeout\ndata: {json.dumps(job)}\n\n"
+                return
+            time.sleep(0.25)
+
+    response = Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    # Called when the server closes the response, even if the stream never started.
+    response.call_on_close(lambda: events_gate.release(time.perf_counter() - opened))
+    return response
+
+@app.route("/api/jobs/stats", methods=["GET"])
+def job_stats_api():
+    """
+    Reports the job queue depth and recent per-job latency.
+    """
+    return create_response("success", ocr_jobs.queue_stats(), "Job queue statistics", 200)
+
+@app.route("/api/ocr/stats", methods=["GET"])
+def ocr_stats_api():
+    """
+    Reports how often the totals-first OCR fast path was enough and the OCR
+    time it saved, and the current admission state of OCR, batch requests
+    and job event streams. Only the tesseract backend takes the fast path.
+    """
+    data = ocr_engine.fast_path_stats()
+    data["admission"] = ocr_gate.stats()
+    data["batch_admission"] = batch_gate.stats()
+    data["events_admission"] = events_gate.stats()
+    return create_response("success", data, "OCR statistics", 200)
+
+@app.route("/admin/profiles", methods=["GET"])
+def list_profiles_api():
+    """
+    Lists the stored request profiles, newest first. Needs the admin token
+    in X-Admin-Token; answers 404 while profiling is off.
+    """
+    if not profiling.is_admin(request.headers):
+        return create_response("error", None, "Not found", 404)
+    records = profiling.list_profiles()
+    return create_response("success", {"profiles": records}, f"{len(records)} profiles", 200)
+
+@app.route("/admin/profiles/<int:profile_id>", methods=["GET"])
+def get_profile_api(profile_id):
+    """
+    Returns one stored profile. format=text (default) is a readable report,
+    format=pstats the cProfile data as a pstats file, and format=collapsed
+    the stack samples as flamegraph input.
+    """
+    if not profiling.is_admin(request.headers):
+        return create_response("error", None, "Not found", 404)
+    record = profiling.get_profile(profile_id)
+    if record is None:
+        return create_response("error", None, "Unknown profile id (it may have been rotated out)", 404)
+
+    output_format = request.args.get("format", "text")
+    if output_format == "text":
+        return Response(profiling.format_text(record), mimetype="text/plain")
+    if output_format == "pstats" and record["mode"] == "cprofile":
+        return Response(profiling.format_pstats(record), mimetype="application/octet-stream",
+                        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.pstats"})
+    if output_format == "collapsed" and record["mode"] == "sample":
+        return Response(profiling.format_collapsed(record), mimetype="text/plain")
+    return create_response("error", None, "format must be text, pstats (cprofile profiles) "
+                           "or collapsed (sampled profiles)", 400)
+
+@app.route("/metrics", methods=["GET"])
+def metrics_api():
+    """
+    Exposes request and stage latency histograms and error counters in the
+    Prometheus text format.
+    """
+    return Response(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/api/expenses", methods=["GET"])
+def list_expenses_api():
+    """
+    Lists expenses, newest first, one page at a time.
+    Query parameters: date, start and end (YYYY-MM-DD) to filter, limit for
+    the page size, after for the next_cursor of the previous page, and
+    count=1 to also return the number of matching expenses.
+    Answers 304 when If-None-Match has the current ETag.
+    """
+    search_date = request.args.get("date")
+    start_date = request.args.get("start")
+    end_date = request.args.get("end")
+    if invalid_date_params(search_date, start_date, end_date):
+        return create_response("error", None, "date, start and end must be dates in YYYY-MM-DD format", 400)
+    try:
+        limit = int(request.args.get("limit", EXPENSES_PAGE_SIZE))
+    except ValueError:
+        return create_response("error", None, "limit must be a number", 400)
+    limit = max(1, min(limit, EXPENSES_MAX_PAGE_SIZE))
+
+    after = None
+    cursor = request.args.get("after")
+    if cursor:
+        # The cursor is the "date,id" of the last expense on the previous page.
+        after_date, _, after_id = cursor.partition(",")
+        if invalid_date_params(after_date) or not after_id.isdigit():
+            return create_response("error", None, "after must be a next_cursor value", 400)
+        after = (after_date, int(after_id))
+
+    etag = expenses_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    records = load_expenses(search_date=search_date, after=after, limit=limit,
+                            start_date=start_date, end_date=end_date)
+    expenses = [
+        {"id": expense_id, "date": expense_date, "description": description, "amount": amount}
+        for expense_date, description, amount, expense_id in records
+    ]
+    data = {"expenses": expenses, "next_cursor": None}
+    if len(records) == limit:
+        last = records[-1]
+        data["next_cursor"] = f"{last[0]},{last[3]}"
+    if request.args.get("count") in ("1", "true"):
+        data["count"] = count_expenses(search_date, start_date, end_date)
+
+    response = create_response("success", data, f"{len(expenses)} expenses", 200)
+    response.set_etag(etag)
+    return response
+
+@app.route("/api/expenses", methods=["POST"])
+def create_expenses_api():
+    """
+    Saves expenses from a JSON body: either one expense
+    {"amount": 12.5, "description": "...", "date": "YYYY-MM-DD"} or
+    {"expenses": [...]} to save many in one transaction. date defaults to today.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return create_response("error", None, "Request body must be a JSON object", 400)
+
+    items = body["expenses"] if "expenses" in body else [body]
+    if not isinstance(items, list) or not items:
+        return create_response("error", None, "expenses must be a non-empty list", 400)
+
+    today = date.today().isoformat()
+    rows = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return create_response("error", None, f"Expense {index} must be a JSON object", 400)
+        amount = item.get("amount")
+        expense_date = item.get("date") or today
+        if not is_valid_amount(amount):
+            return create_response("error", None, f"Expense {index} needs a numeric amount", 400)
+        description = item.get("description")
+        if description is not None and not isinstance(description, str):
+            return create_response("error", None, f"Expense {index} description must be a string", 400)
+        if not is_valid_date(expense_date):
+            return create_response("error", None, f"Expense {index} date must be in YYYY-MM-DD format", 400)
+        rows.append((expense_date, description or "Expense", amount))
+
+    if "expenses" not in body:
+        expense_date, description, amount = rows[0]
+        expense_id = save_expense(amount, description, expense_date)
+        if expense_id is None:
+            return create_response("error", None, "Could not save the expense", 500)
+        return create_response("success", {"id": expense_id}, "Expense saved", 201)
+
+    try:
+        saved = save_expenses_bulk(rows)
+    except sqlite3.Error as e:
+        logger.error("Bulk expense save failed: %s", e)
+        return create_response("error", None, "Could not save the expenses", 500)
+    return create_response("success", {"saved": saved}, f"Saved {saved} expenses", 201)
+
+def summary_period(view, anchor):
+    """
+    Returns the (start, end) dates of the calendar week (Monday to Sunday)
+    or month containing anchor.
+    """
+    if view == "week":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=6)
+    start = anchor.replace(day=1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return start, next_month - timedelta(days=1)
+
+@app.route("/api/summary", methods=["GET"])
+def summary_api():
+    """
+    Returns the dashboard figures for the week or month containing today (or
+    the date parameter): income, expense, balance and the latest transactions.
+    Summaries are cached per view and recomputed only after expenses change.
+    """
+    view = request.args.get("view", "week")
+    if view not in ("week", "month"):
+        return create_response("error", None, "view must be week or month", 400)
+    anchor_param = request.args.get("date")
+    if invalid_date_params(anchor_param):
+        return create_response("error", None, "date must be in YYYY-MM-DD format", 400)
+    anchor = date.fromisoformat(anchor_param) if anchor_param else date.today()
+
+    version = get_expenses_version()
+    etag = f"expenses-{version}-{view}-{anchor.isoformat()}"
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    key = (view, anchor)
+    entry = summary_cache.get(key)
+    if entry is not None and entry[0] == version:
+        data = entry[1]
+    else:
+        start, end = summary_period(view, anchor)
+        expense, recent = get_period_summary(start.isoformat(), end.isoformat(), SUMMARY_RECENT_LIMIT)
+        # expenses.db only records spending, so there is no income to report yet.
+        income = 0.0
+        data = {
+            "view": view,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "income": income,
+            "expense": expense,
+            "balance": round(income - expense, 2),
+            "transactions": [
+                {"id": expense_id, "item": description, "amount": amount, "date": expense_date, "type": "expense"}
+                for expense_date, description, amount, expense_id in recent
+            ],
+        }
+        if len(summary_cache) >= SUMMARY_CACHE_SIZE:
+            summary_cache.clear()
+        summary_cache[key] = (version, data)
+
+    response = create_response("success", data, f"{view} summary", 200)
+    response.set_etag(etag)
+    return response
+
+@app.route("/api/expenses/totals", methods=["GET"])
+def expense_totals_api():
+    """
+    Returns expense totals per day, week, month or year from the rollup tables.
+    Query parameters: bucket (day, week, month, year or auto), start and end (YYYY-MM-DD).
+    With bucket=auto the bucket is picked so the range fits in about 60 points.
+    Answers 304 when If-None-Match has the current ETag.
+    """
+    bucket = request.args.get("bucket", "auto")
+    start_date = request.args.get("start")
+    end_date = request.args.get("end")
+    if invalid_date_params(start_date, end_date):
+        return create_response("error", None, "start and end must be dates in YYYY-MM-DD format", 400)
+
+    etag = expenses_etag()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    if bucket == "auto":
+        first, last = get_date_range()
+        bucket = pick_bucket(start_date or first, end_date or last)
+    if bucket not in BUCKETS:
+        return create_response("error", None, f"bucket must be one of: auto, {', '.join(BUCKETS)}", 400)
+
+    records = get_totals(bucket, start_date, end_date)
+    totals = [{"period": period, "total": total} for period, total in records]
+    response = create_response("success", {"bucket": bucket, "totals": totals}, f"{len(totals)} {bucket} totals", 200)
+    response.set_etag(etag)
+    return response
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server only; production runs under gunicorn (see wsgi.py).
+    app.run(host='0.0.0.0', port=5000, debug=os.environ.get("FLASK_DEBUG", "1") == "1")
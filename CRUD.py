@@ -1,81 +1,316 @@
+import math
 import sqlite3
-from datetime import datetime 
+from datetime import datetime, date
+
+# Largest absolute amount accepted, in dollars. Its cents must fit in an
+# SQLite INTEGER with room to spare for the period totals.
+MAX_AMOUNT = 1e12
+from migrations import migrate
+from connection import get_connection
 
 def setup_database():
     """
-    Initializes the SQLite database and creates both the expenses and daily_totals tables.
+    Initializes the SQLite database and migrates the expenses and daily_totals
+    tables to the current schema version.
     """
-    conn = sqlite3.connect('expenses.db')
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS expenses (
-            date TEXT,
-            description TEXT,
-            amount REAL
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS daily_totals (
-            date TEXT PRIMARY KEY,
-            total REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
+    migrate(get_connection())
+
+def rebuild_daily_totals():
+    """
+    Recomputes daily_totals from scratch out of the expenses table.
+    Use it to repair totals after editing the database by hand or from an older version.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM daily_totals")
+            # The daily_totals triggers refill the rollups as the days are re-inserted.
+            conn.execute("DELETE FROM period_totals")
+            conn.execute("""
+                INSERT INTO daily_totals (date, total_cents)
+                SELECT date, SUM(amount_cents) FROM expenses GROUP BY date
+            """)
+            bump_change_counter(conn)
+    except sqlite3.Error as e:
+        print(f"Database error: {e}")
+
+def bump_change_counter(conn):
+    """
+    Marks the expenses data as changed. Triggers do this for ordinary writes;
+    call it for writes that bypass them.
+    """
+    conn.execute("UPDATE change_counters SET version = version + 1 WHERE name = 'expenses'")
+
+def get_expenses_version():
+    """
+    Returns a counter that changes whenever expenses or daily_totals change.
+    Compare it with an earlier value to know whether cached data is stale.
+    """
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT version FROM change_counters WHERE name = 'expenses'")
+    return cursor.fetchone()[0]
 
 def save_expense(amount, description="Receipt from OCR", expense_date=None):
     """
-    Saves a new expense record and updates the daily total in the database.
+    Saves a new expense record. The daily total is updated by the
+    expenses_daily_total_insert trigger. Returns the new expense id, or
+    None if it could not be saved.
     """
-    conn = sqlite3.connect('expenses.db')
-    cursor = conn.cursor()
-    
     if expense_date is None:
         current_date_str = datetime.now().strftime("%Y-%m-%d")
     else:
         current_date_str = expense_date
 
+    conn = get_connection()
     try:
-        cursor.execute("INSERT INTO expenses (date, description, amount) VALUES (?, ?, ?)",
-                       (current_date_str, description, float(amount)))
-        
-        cursor.execute("SELECT SUM(amount) FROM expenses WHERE date = ?", (current_date_str,))
-        total_for_day = cursor.fetchone()[0]
-        
-        cursor.execute("INSERT OR REPLACE INTO daily_totals (date, total) VALUES (?, ?)",
-                       (current_date_str, total_for_day))
-        
-        conn.commit()
+        with conn:
+            cursor = conn.execute("INSERT INTO expenses (date, description, amount_cents) VALUES (?, ?, ?)",
+                                  (current_date_str, description, to_cents(amount)))
+        return cursor.lastrowid
     except sqlite3.Error as e:
         print(f"Database error: {e}")
-    finally:
-        conn.close()
-    
-def load_expenses(search_date=None):
+        return None
+
+def save_expenses_bulk(rows):
     """
-    Loads expenses from the database, optionally filtered by date.
-    Returns a list of records.
+    Saves many expenses in a single transaction. rows is an iterable of
+    (date, description, amount) tuples. The per-row daily_totals trigger is
+    switched off for the transaction and each affected date is updated once.
+    Returns the number of rows saved; nothing is saved if any row fails.
+    """
+    records = []
+    totals_by_date = {}
+    for expense_date, description, amount in rows:
+        cents = to_cents(amount)
+        records.append((expense_date, description, cents))
+        totals_by_date[expense_date] = totals_by_date.get(expense_date, 0) + cents
+    if not records:
+        return 0
+
+    conn = get_connection()
+    with conn:
+        conn.execute("INSERT INTO bulk_insert_guard (active) VALUES (1)")
+        conn.executemany("INSERT INTO expenses (date, description, amount_cents) VALUES (?, ?, ?)", records)
+        conn.executemany(
+            """
+            INSERT INTO daily_totals (date, total_cents) VALUES (?, ?)
+            ON CONFLICT(date) DO UPDATE SET total_cents = total_cents + excluded.total_cents
+            """,
+            totals_by_date.items(),
+        )
+        bump_change_counter(conn)
+        conn.execute("DELETE FROM bulk_insert_guard")
+    return len(records)
+
+def to_cents(amount):
+    """
+    Converts an amount in dollars (float, int or numeric string) to integer cents.
+    """
+    return int(round(float(amount) * 100))
+
+def is_valid_date(value):
+    """
+    Returns True if value is a date string in exactly YYYY-MM-DD form, the
+    only form the rollup triggers and date comparisons understand.
+    """
+    if not isinstance(value, str):
+        return False
+    try:
+        return date.fromisoformat(value).isoformat() == value
+    except ValueError:
+        return False
+
+def is_valid_amount(amount):
+    """
+    Returns True if amount is a finite number, or numeric string, smaller
+    than MAX_AMOUNT either way, so to_cents() can store it.
+    """
+    if isinstance(amount, bool) or not isinstance(amount, (int, float, str)):
+        return False
+    try:
+        value = float(amount)
+    except (ValueError, OverflowError):
+        return False
+    return math.isfinite(value) and abs(value) < MAX_AMOUNT
+
+def load_expenses(search_date=None, after=None, limit=None, offset=None, start_date=None, end_date=None):
     """
-    with sqlite3.connect("expenses.db") as conn:
-        cursor = conn.cursor()
-        if search_date:
-            # Using an exact match for date, which is more robust
-            cursor.execute(
-                "SELECT * FROM expenses WHERE date = ? ORDER BY date DESC",
-                (search_date,),
-            )
-        else:
-            cursor.execute("SELECT * FROM expenses ORDER BY date DESC")
-        records = cursor.fetchall()
-    return records
-    
+    Loads expenses from the database, newest first, optionally filtered by date
+    or by a start_date / end_date range (inclusive).
+    Returns a list of (date, description, amount, id) records.
+
+    For keyset pagination pass limit, then pass the (date, id) of the last
+    record of a page as after= to get the next page. offset= is only for
+    jumping to an arbitrary position, as it still walks the skipped rows.
+    """
+    conditions, params = expense_filters(search_date, start_date, end_date)
+    if after is not None:
+        conditions.append("(date, id) < (?, ?)")
+        params.extend(after)
+
+    query = "SELECT date, description, amount_cents / 100.0, id FROM expenses"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY date DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+        if offset:
+            query += " OFFSET ?"
+            params.append(offset)
+
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def expense_filters(search_date=None, start_date=None, end_date=None):
+    """
+    Builds the WHERE conditions and parameters shared by load_expenses and
+    count_expenses. All of them can use idx_expenses_date.
+    """
+    conditions = []
+    params = []
+    if search_date:
+        # Using an exact match for date, which is more robust
+        conditions.append("date = ?")
+        params.append(search_date)
+    if start_date:
+        conditions.append("date >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("date <= ?")
+        params.append(end_date)
+    return conditions, params
+
+def count_expenses(search_date=None, start_date=None, end_date=None):
+    """
+    Returns the number of expenses, optionally only those on search_date
+    or between start_date and end_date.
+    """
+    conditions, params = expense_filters(search_date, start_date, end_date)
+    query = "SELECT COUNT(*) FROM expenses"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    return cursor.fetchone()[0]
+
+def iter_expenses(search_date=None, batch_size=1000):
+    """
+    Yields expenses in lists of at most batch_size records, in the same order
+    as load_expenses. Each batch is its own keyset query, so only one batch
+    is ever held in memory and no read transaction stays open between batches.
+    """
+    after = None
+    while True:
+        batch = load_expenses(search_date=search_date, after=after, limit=batch_size)
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        after = (last[0], last[3])
+
 def get_daily_totals():
     """
     Loads daily totals from the database, ordered by date.
     Returns a list of records.
     """
-    with sqlite3.connect("expenses.db") as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM daily_totals ORDER BY date ASC")
-        records = cursor.fetchall()
-    return records
\ No newline at end of file
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT date, total_cents / 100.0 FROM daily_totals ORDER BY date ASC")
+    return cursor.fetchall()
+
+# SQL that maps a date to its rollup period, matching the period_totals triggers.
+PERIOD_SQL = {
+    "week": "date(?, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', ?)",
+    "year": "strftime('%Y', ?)",
+}
+BUCKETS = ("day", "week", "month", "year")
+
+def get_totals(bucket="day", start_date=None, end_date=None):
+    """
+    Loads expense totals per day, week, month or year, ordered by period.
+    Optional start_date and end_date ('YYYY-MM-DD', inclusive) limit the range
+    to the periods containing them. Returns a list of (period, total) records;
+    weeks are labelled by their Monday, months as 'YYYY-MM', years as 'YYYY'.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"Unknown bucket {bucket!r}, expected one of {', '.join(BUCKETS)}")
+
+    if bucket == "day":
+        query = "SELECT date, total_cents / 100.0 FROM daily_totals WHERE 1 = 1"
+        period_sql = "?"
+        params = []
+        column = "date"
+    else:
+        query = "SELECT period, total_cents / 100.0 FROM period_totals WHERE bucket = ?"
+        period_sql = PERIOD_SQL[bucket]
+        params = [bucket]
+        column = "period"
+
+    if start_date:
+        query += f" AND {column} >= {period_sql}"
+        params.append(start_date)
+    if end_date:
+        query += f" AND {column} <= {period_sql}"
+        params.append(end_date)
+    query += f" ORDER BY {column} ASC"
+
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+def get_period_summary(start_date, end_date, recent_limit=10):
+    """
+    Returns (total, recent) for the expenses between start_date and end_date
+    (inclusive) in one statement: the total comes from daily_totals and recent
+    is a list of the newest (date, description, amount, id) records, both
+    read through their date indexes, so the cost depends on the length of
+    the period and not on the size of the history.
+    """
+    cursor = get_connection().cursor()
+    cursor.execute("""
+        WITH period AS (
+            SELECT COALESCE(SUM(total_cents), 0) AS total_cents
+            FROM daily_totals WHERE date >= ? AND date <= ?
+        ),
+        recent AS (
+            SELECT date, description, amount_cents, id FROM expenses
+            WHERE date >= ? AND date <= ?
+            ORDER BY date DESC, id DESC LIMIT ?
+        )
+        SELECT period.total_cents / 100.0, recent.date, recent.description,
+               recent.amount_cents / 100.0, recent.id
+        FROM period LEFT JOIN recent
+        ORDER BY recent.date DESC, recent.id DESC
+    """, (start_date, end_date, start_date, end_date, recent_limit))
+    rows = cursor.fetchall()
+    total = rows[0][0]
+    recent = [row[1:] for row in rows if row[4] is not None]
+    return total, recent
+
+def get_date_range():
+    """
+    Returns the (first, last) dates that have expenses, or (None, None).
+    """
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT MIN(date), MAX(date) FROM daily_totals")
+    return cursor.fetchone()
+
+def pick_bucket(start_date, end_date, max_points=60):
+    """
+    Picks the finest bucket that shows the range from start_date to end_date
+    ('YYYY-MM-DD') in at most max_points bars.
+    """
+    if not start_date or not end_date:
+        return "day"
+    days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+    if days <= max_points:
+        return "day"
+    if days <= max_points * 7:
+        return "week"
+    if days <= max_points * 31:
+        return "month"
+    return "year"
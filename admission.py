@@ -0,0 +1,138 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+# Admission control for expensive endpoints: a bounded number of requests in
+# flight with a short wait queue behind them, and optional per-client token
+# buckets. Rejected requests get a Retry-After estimate in seconds, so the
+# server answers quickly instead of letting every request slow down together.
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request cannot be admitted. retry_after is a suggested
+    wait in whole seconds.
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Lets at most max_in_flight callers hold a slot at once. Up to max_waiting
+    more may wait, each for at most wait_timeout seconds; anyone beyond that
+    is turned away at once. Pair every successful acquire() with release().
+    """
+
+    def __init__(self, max_in_flight, max_waiting, wait_timeout):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        # Moving average of how long a slot is held, for Retry-After.
+        self.mean_service_seconds = 1.0
+        self.condition = threading.Condition()
+
+    def check_capacity(self):
+        """
+        Raises Overloaded if a new request would be turned away without
+        waiting. Cheap enough to call before reading a request body.
+        """
+        with self.condition:
+            if self.in_flight >= self.max_in_flight and self.waiting >= self.max_waiting:
+                raise Overloaded("Server is busy, wait queue is full", self.retry_after())
+
+    def retry_after(self):
+        """
+        Estimates how long until the current backlog has drained, in whole seconds.
+        Must be called with the condition held.
+        """
+        backlog = self.in_flight + self.waiting
+        return max(1, math.ceil(self.mean_service_seconds * backlog / self.max_in_flight))
+
+    def acquire(self):
+        """
+        Takes a slot, waiting briefly if all are busy. Raises Overloaded if
+        the wait queue is full or the wait times out.
+        """
+        with self.condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return
+            if self.waiting >= self.max_waiting:
+                raise Overloaded("Server is busy, wait queue is full", self.retry_after())
+
+            self.waiting += 1
+            try:
+                admitted = self.condition.wait_for(lambda: self.in_flight < self.max_in_flight, self.wait_timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                raise Overloaded("Server is busy, timed out waiting for a slot", self.retry_after())
+            self.in_flight += 1
+
+    def acquire_waiting(self):
+        """
+        Takes a slot, waiting as long as it takes. For background work that
+        has no client to turn away; such waiters do not count against max_waiting.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.max_in_flight)
+            self.in_flight += 1
+
+    def release(self, held_seconds):
+        """
+        Gives a slot back; held_seconds feeds the Retry-After estimate.
+        """
+        with self.condition:
+            self.in_flight -= 1
+            self.mean_service_seconds = 0.9 * self.mean_service_seconds + 0.1 * held_seconds
+            self.condition.notify()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "max_in_flight": self.max_in_flight,
+                "max_waiting": self.max_waiting,
+                "mean_service_seconds": round(self.mean_service_seconds, 3),
+            }
+
+
+class RateLimiter:
+    """
+    Per-client token buckets: each client may make burst requests at once
+    and earns rate_per_minute / 60 more tokens per second. Only the
+    max_clients most recently seen clients are tracked.
+    """
+
+    def __init__(self, rate_per_minute, burst, max_clients=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, time of the last update)
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def check(self, client):
+        """
+        Spends one token for client. Raises Overloaded with the time until
+        the next token when the bucket is empty.
+        """
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated = self.buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.buckets[client] = (tokens, now)
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        if not allowed:
+            raise Overloaded("Too many requests", max(1, math.ceil((1 - tokens) / self.rate)))
@@ -0,0 +1,90 @@
+"""
+Benchmark for the per-insert cost of CRUD.save_expense as the expenses
+table grows. With the daily_totals triggers the cost should stay flat;
+the old SUM re-aggregation query is timed alongside for comparison.
+
+Run from the repository root:  python benchmarks/bench_daily_totals.py
+Set BENCH_MAX_ROWS to change the largest table size (default 1,000,000).
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import CRUD
+import connection
+
+SAMPLES = 200
+
+
+def random_rows(rng, count):
+    """
+    Yields synthetic expense rows spread over roughly ten years of dates.
+    """
+    start = date(2015, 1, 1)
+    for _ in range(count):
+        day = start + timedelta(days=rng.randrange(3650))
+        yield (day.isoformat(), "Synthetic expense", rng.randint(100, 20000))
+
+
+def grow_table(rng, rows, db_path):
+    """
+    Appends rows straight into the database at db_path in one transaction.
+    """
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany("INSERT INTO expenses (date, description, amount_cents) VALUES (?, ?, ?)", random_rows(rng, rows))
+
+
+def time_save_expense(rng):
+    """
+    Returns the mean wall time of one save_expense call in microseconds.
+    """
+    rows = list(random_rows(rng, SAMPLES))
+    started = time.perf_counter()
+    for day, description, amount_cents in rows:
+        CRUD.save_expense(amount_cents / 100, description, expense_date=day)
+    return (time.perf_counter() - started) / SAMPLES * 1e6
+
+
+def time_legacy_sum(rng, db_path):
+    """
+    Returns the mean wall time of the SUM query the old save_expense ran after
+    each insert, forced to scan the table as it did before the date indexes existed.
+    """
+    days = [row[0] for row in random_rows(rng, SAMPLES)]
+    with sqlite3.connect(db_path) as conn:
+        started = time.perf_counter()
+        for day in days:
+            conn.execute("SELECT SUM(amount_cents) FROM expenses NOT INDEXED WHERE date = ?", (day,)).fetchone()
+        return (time.perf_counter() - started) / SAMPLES * 1e6
+
+
+def main():
+    max_rows = int(os.environ.get("BENCH_MAX_ROWS", 1_000_000))
+    checkpoints = [size for size in (1_000, 10_000, 100_000, 1_000_000, 10_000_000) if size <= max_rows]
+    rng = random.Random(42)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "expenses.db")
+        connection.set_database_path(db_path)
+        CRUD.setup_database()
+        print(f"{'rows':>10}  {'save_expense':>14}  {'old SUM query':>14}")
+
+        current = 0
+        for size in checkpoints:
+            grow_table(rng, size - current, db_path)
+            current = size
+            insert_us = time_save_expense(rng)
+            sum_us = time_legacy_sum(rng, db_path)
+            print(f"{size:>10}  {insert_us:>11.1f} us  {sum_us:>11.1f} us")
+            current += SAMPLES
+        connection.close_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for ocr_backends.HttpBackend against the stand-in OCR server:
+a pooled keep-alive session versus a new connection per request, at the
+same concurrency. Reports throughput, p50/p99 latency and how many TCP
+connections the server accepted.
+
+Run from the repository root:  python benchmarks/bench_ocr_backend.py
+Set BENCH_REQUESTS, BENCH_CONCURRENCY and BENCH_LATENCY_MS to change the load.
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+from ocr_backends import HttpBackend
+from ocr_stub_server import StubOcrHandler, make_server
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", 400))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", 8))
+LATENCY_MS = float(os.environ.get("BENCH_LATENCY_MS", 5))
+IMAGE = b"\x89PNG" + b"\0" * 200 * 1024
+
+
+class UnpooledBackend(HttpBackend):
+    """
+    HttpBackend without connection reuse: every request opens a new connection.
+    """
+
+    def recognize(self, image_data):
+        with self.slots:
+            response = requests.post(self.url, data=image_data, headers={"Connection": "close"}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["text"]
+
+
+def percentile(sorted_values, pct):
+    index = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def run(backend):
+    """
+    Sends REQUESTS images through backend from CONCURRENCY threads.
+    Returns (requests per second, p50 ms, p99 ms, connections opened).
+    """
+    StubOcrHandler.connections = 0
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        backend.recognize(IMAGE)
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        list(executor.map(one, range(REQUESTS)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return REQUESTS / wall, percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, StubOcrHandler.connections
+
+
+def main():
+    server = make_server(port=0, latency=LATENCY_MS / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/ocr"
+    print(f"{REQUESTS} requests, concurrency {CONCURRENCY}, server latency {LATENCY_MS} ms, "
+          f"{len(IMAGE) // 1024} KB images")
+
+    for name, backend in (("new connection", UnpooledBackend(url, max_concurrency=CONCURRENCY)),
+                          ("pooled session", HttpBackend(url, max_concurrency=CONCURRENCY))):
+        throughput, p50, p99, connections = run(backend)
+        print(f"{name:>15}: {throughput:7.1f} req/s  p50 {p50:6.1f} ms  p99 {p99:6.1f} ms  "
+              f"{connections} connections")
+        backend.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
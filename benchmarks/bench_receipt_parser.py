@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for receipt_parser.find_total against the old three-stage
+regex cascade, over a corpus of synthetic receipts. Before timing, it checks
+that both return the same total for every receipt in the corpus.
+
+Run from the repository root:  python benchmarks/bench_receipt_parser.py
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_parser import find_total
+
+ITEMS = ["Milk", "Bread", "Eggs", "Coffee", "Rice", "Chicken", "Apples", "Soap", "Noodles", "Tea"]
+TOTAL_LABELS = ["Total", "TOTAL", "Grand Total", "Balance Due", "Amount Paid", None]
+CURRENCIES = ["", "$", "RM ", "SGD "]
+
+
+def make_receipt(rng):
+    """
+    Builds one synthetic receipt with a random number of items and layout.
+    Amounts are printed with thousands separators, as receipts do; the old
+    cascade reads an ungrouped "1234.56" as 123.
+    """
+    currency = rng.choice(CURRENCIES)
+    lines = ["GROCERY STORE", f"{rng.randint(1, 999)} Main Street", "-" * 20]
+    subtotal = 0.0
+    for _ in range(rng.randint(3, 40)):
+        price = round(rng.uniform(0.5, 80), 2)
+        subtotal += price
+        lines.append(f"{rng.choice(ITEMS):<20} {currency}{price:.2f}")
+    tax = round(subtotal * 0.08, 2)
+    lines.append(f"Subtotal {subtotal:>12,.2f}")
+    lines.append(f"Tax {tax:>17,.2f}")
+    label = rng.choice(TOTAL_LABELS)
+    total = subtotal + tax
+    if label:
+        lines.append(f"{label}: {currency}{total:,.2f}")
+    else:
+        lines.append(f"{currency}{total:,.2f}")
+    lines.append(f"Card ****{rng.randint(1000, 9999)}")
+    return "\n".join(lines)
+
+
+def legacy_parse_receipt(text):
+    """
+    The previous API.parse_receipt cascade, without its print calls.
+    """
+    total_pattern = re.compile(
+        r'(?:total|grand\s*total|balance\s*due|amount\s*paid|sum|price|charge|total\s*due)\s*[:\-]?\s*(?:\$|RM|MYR|SGD|€)?\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)',
+        re.IGNORECASE
+    )
+    matches = total_pattern.findall(text)
+    if matches:
+        return float(matches[-1].replace(',', ''))
+    all_decimal_numbers = re.findall(r'\b\d+\.\d{2}\b', text)
+    if all_decimal_numbers:
+        return max(float(n) for n in all_decimal_numbers)
+    numbers = re.compile(r'\b\d+\.?\d*\b').findall(text)
+    cleaned_numbers = [float(n) for n in numbers if float(n) > 1.0]
+    if cleaned_numbers:
+        return max(cleaned_numbers)
+    return None
+
+
+def main():
+    rng = random.Random(42)
+    corpus = [make_receipt(rng) for _ in range(int(os.environ.get("BENCH_RECEIPTS", 2000)))]
+    repeat = int(os.environ.get("BENCH_REPEAT", 5))
+
+    # The totals-first OCR fast path relies on find_total picking the same
+    # keyword total as the old API, so a speedup that changes answers fails here.
+    for text in corpus:
+        expected = legacy_parse_receipt(text)
+        total, line, source = find_total(text)
+        assert total == expected, f"find_total returned {total}, legacy cascade {expected}, for:\n{text}"
+
+    for name, func in (("legacy cascade", legacy_parse_receipt), ("find_total", find_total)):
+        best = min(timeit.repeat(lambda: [func(text) for text in corpus], number=1, repeat=repeat))
+        per_receipt = best / len(corpus) * 1e6
+        print(f"{name:<16} {best * 1000:8.1f} ms for {len(corpus)} receipts  ({per_receipt:.1f} us/receipt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup-time benchmark for the desktop app.
+
+Measures the cold import cost of each heavy dependency in a fresh
+interpreter, then launches expensetracker.py with
+EXPENSE_TRACKER_EXIT_AFTER_STARTUP=1, which prints the time to the first
+frame and which heavy modules were loaded by then, and exits.
+The app run needs a display.
+
+Run from the repository root:  python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = int(os.environ.get("BENCH_RUNS", 5))
+
+HEAVY_MODULES = [
+    "customtkinter",
+    "tkcalendar",
+    "matplotlib.figure",
+    "matplotlib.backends.backend_tkagg",
+    "numpy",
+    "PIL.Image",
+    "pytesseract",
+    "tesserocr",
+]
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {0}; print(time.perf_counter() - t)"
+
+
+def import_time(module):
+    """
+    Returns the best cold import time of a module in milliseconds, or None if it is not installed.
+    """
+    best = None
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+        seconds = float(result.stdout.strip())
+        best = seconds if best is None else min(best, seconds)
+    return best * 1000
+
+
+def app_startup():
+    """
+    Runs the app until its first frame and returns the lines it printed about startup.
+    """
+    env = dict(os.environ, EXPENSE_TRACKER_EXIT_AFTER_STARTUP="1")
+    result = subprocess.run([sys.executable, "expensetracker.py"], cwd=ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    lines = [line for line in result.stdout.splitlines() if line.startswith(("Startup:", "Heavy modules"))]
+    if result.returncode != 0 or not lines:
+        return [f"App did not start: {result.stderr.strip().splitlines()[-1:] or result.returncode}"]
+    return lines
+
+
+def main():
+    print("Cold import cost (best of %d runs):" % RUNS)
+    for module in HEAVY_MODULES:
+        elapsed = import_time(module)
+        status = "not installed" if elapsed is None else f"{elapsed:8.1f} ms"
+        print(f"  {module:<36} {status}")
+
+    print("\nApp startup:")
+    for _ in range(RUNS):
+        lines = app_startup()
+        for line in lines:
+            print("  " + line)
+        if lines[0].startswith("App did not start"):
+            break
+
+
+if __name__ == "__main__":
+    main()
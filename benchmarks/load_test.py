@@ -0,0 +1,115 @@
+"""
+Load test for POST /api/parse-receipt. Sends receipts from several
+concurrent clients for a fixed duration and reports throughput and
+p50/p90/p99 latency.
+
+Usage:
+    python benchmarks/load_test.py [--url URL] [--concurrency N] [--duration SECONDS] [--image PATH]
+Without --image a synthetic receipt-sized PNG is generated, so set a
+distinct seed per run (--unique) if the OCR cache should not absorb repeats.
+With the default fake OCR backend, start the server with OCR_FAKE_PREPROCESS=1
+so the preprocessing stage is part of what is measured.
+"""
+import argparse
+import io
+import threading
+import time
+
+import requests
+
+
+def synthetic_receipt(unique_id=0):
+    """
+    Returns PNG bytes for a plain receipt-shaped image.
+    """
+    from PIL import Image, ImageDraw
+
+    image = Image.new("L", (800, 2000), 255)
+    draw = ImageDraw.Draw(image)
+    for row in range(40):
+        draw.text((40, 40 + row * 45), f"ITEM {row:02d} {unique_id}      {row * 1.25:.2f}", fill=0)
+    draw.text((40, 1900), "TOTAL      50.00", fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of a sorted list.
+    """
+    if not sorted_values:
+        return float("nan")
+    index = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def client(url, images, deadline, latencies, errors, lock):
+    """
+    Posts receipts in a loop until the deadline, recording each request's latency.
+    """
+    session = requests.Session()
+    count = 0
+    while time.perf_counter() < deadline:
+        image = images[count % len(images)]
+        count += 1
+        started = time.perf_counter()
+        try:
+            response = session.post(url, files={"receipt": ("receipt.png", image, "image/png")}, timeout=60)
+            ok = response.status_code == 200
+            status = response.status_code
+        except requests.RequestException as e:
+            ok = False
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[status] = errors.get(status, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:5000/api/parse-receipt")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--image", help="receipt image to upload instead of a synthetic one")
+    parser.add_argument("--unique", type=int, default=0,
+                        help="number of distinct synthetic images to rotate through")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            images = [f.read()]
+    else:
+        images = [synthetic_receipt(i) for i in range(max(1, args.unique))]
+
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=client, args=(args.url, images, deadline, latencies, errors, lock))
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies)} ok, {sum(errors.values())} failed in {wall:.1f}s "
+          f"with {args.concurrency} clients")
+    print(f"throughput: {len(latencies) / wall:.1f} req/s")
+    print(f"latency p50: {percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p90: {percentile(latencies, 90) * 1000:.1f} ms  "
+          f"p99: {percentile(latencies, 99) * 1000:.1f} ms")
+    if errors:
+        print("errors: " + ", ".join(f"{status} x{count}" for status, count in sorted(errors.items(), key=str)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Local stand-in for a remote OCR service, for benchmarking HttpBackend
+offline. POST an image to /ocr and it answers {"text": ...} with the sample
+receipt after a configurable delay. It speaks HTTP/1.1 keep-alive, so
+connection pooling makes a measurable difference.
+
+Usage:
+    python benchmarks/ocr_stub_server.py [--port 8765] [--latency-ms 50] [--jitter-ms 10]
+                                         [--tail-ms 500] [--tail-rate 0.01] [--error-rate 0]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_backends import SAMPLE_RECEIPT_TEXT
+
+
+class StubOcrHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # waits for a delayed ACK on reused connections.
+    disable_nagle_algorithm = True
+    # Set by make_server: latency, jitter, tail, tail_rate and error_rate in seconds / fractions.
+    settings = {}
+    # Connections accepted so far, to show how well clients reuse them.
+    connections = 0
+    connections_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubOcrHandler.connections_lock:
+            StubOcrHandler.connections += 1
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        settings = self.settings
+        delay = settings["latency"] + random.uniform(-settings["jitter"], settings["jitter"])
+        if random.random() < settings["tail_rate"]:
+            delay += settings["tail"]
+        time.sleep(max(0.0, delay))
+
+        if random.random() < settings["error_rate"]:
+            self.send_json(503, {"error": "simulated overload"})
+        else:
+            self.send_json(200, {"text": SAMPLE_RECEIPT_TEXT})
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=8765, latency=0.05, jitter=0.0, tail=0.0, tail_rate=0.0, error_rate=0.0):
+    """
+    Creates the stub server; call serve_forever() on it (e.g. in a thread).
+    Port 0 picks a free port, see server.server_address.
+    """
+    StubOcrHandler.settings = {
+        "latency": latency,
+        "jitter": jitter,
+        "tail": tail,
+        "tail_rate": tail_rate,
+        "error_rate": error_rate,
+    }
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubOcrHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in OCR server with configurable latency.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--tail-ms", type=float, default=0, help="extra delay added to a tail-rate share of requests")
+    parser.add_argument("--tail-rate", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency_ms / 1000, args.jitter_ms / 1000,
+                         args.tail_ms / 1000, args.tail_rate, args.error_rate)
+    print(f"Stub OCR server on http://127.0.0.1:{server.server_address[1]}/ocr")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
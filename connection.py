@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+
+# Path of the expenses database. Override with EXPENSES_DB_PATH or set_database_path().
+DATABASE_PATH = os.environ.get("EXPENSES_DB_PATH", "expenses.db")
+# How long a writer waits for a lock held by another process before failing, in ms.
+BUSY_TIMEOUT_MS = int(os.environ.get("EXPENSES_DB_BUSY_TIMEOUT_MS", 5000))
+# Size of each connection's prepared statement cache.
+STATEMENT_CACHE_SIZE = 256
+
+local = threading.local()
+# Every pooled connection with the thread that owns it, so connections of
+# finished threads (e.g. per-request server threads) can be closed.
+all_connections = []
+all_connections_lock = threading.Lock()
+# Bumped by close_connections() so every thread drops its closed connections.
+pool_generation = 0
+
+
+def set_database_path(path):
+    """
+    Points every later get_connection() call at a different database file.
+    Connections to the old file are closed.
+    """
+    global DATABASE_PATH
+    close_connections()
+    DATABASE_PATH = path
+
+
+def open_connection(path):
+    """
+    Opens and tunes a new connection: WAL journal so readers never block the
+    writer, synchronous=NORMAL (safe with WAL) and a busy timeout instead of
+    immediate "database is locked" errors.
+    """
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def get_connection():
+    """
+    Returns the long-lived connection for the current thread, opening it on
+    first use. Use it as a context manager to commit or roll back a transaction.
+    """
+    if getattr(local, "generation", None) != pool_generation:
+        local.connections = {}
+        local.generation = pool_generation
+    connections = local.connections
+
+    conn = connections.get(DATABASE_PATH)
+    if conn is None:
+        conn = open_connection(DATABASE_PATH)
+        connections[DATABASE_PATH] = conn
+        with all_connections_lock:
+            close_dead_thread_connections()
+            all_connections.append((threading.current_thread(), conn))
+    return conn
+
+
+def close_dead_thread_connections():
+    """
+    Closes the connections owned by threads that have exited.
+    Must be called with all_connections_lock held.
+    """
+    alive = []
+    for thread, conn in all_connections:
+        if thread.is_alive():
+            alive.append((thread, conn))
+        else:
+            conn.close()
+    all_connections[:] = alive
+
+
+def close_connections():
+    """
+    Closes every pooled connection, from all threads. Threads get a fresh
+    connection the next time they call get_connection().
+    """
+    global pool_generation
+    with all_connections_lock:
+        for thread, conn in all_connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        all_connections.clear()
+        pool_generation += 1
@@ -1,152 +1,275 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import customtkinter as ctk
-import pytesseract
-from PIL import Image
 from tkinter import filedialog, ttk
 from tkcalendar import Calendar
 import re
 from datetime import datetime
 import sys
 import tkinter as tk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
-from tkinter import filedialog, ttk
-import re
-import sqlite3
-import datetime
-
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+import os
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Import all database functions from the separate CRUD file
-from CRUD import setup_database, save_expense, load_expenses, get_daily_totals
-
-# Set the path to the Tesseract executable
-try:
-    pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-except FileNotFoundError:
-    print("Tesseract executable not found. Please check the path.", file=sys.stderr)
+from CRUD import (setup_database, save_expense, load_expenses, count_expenses, get_expenses_version,
+                  get_totals, get_date_range, pick_bucket)
+from ocr_cache import setup_cache, cached_ocr
+from receipt_parser import find_total
+import ocr_engine
+
+# matplotlib, numpy/PIL (through image_preprocessing) and the Tesseract
+# binding are slow to import, so they are loaded the first time the Statistics
+# tab or the receipt picker needs them. See ocr_engine and create_daily_totals_plot.
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
+ocr_engine.set_tesseract_cmd(TESSERACT_CMD)
+
+# Set to 1 to print the startup time and exit once the first frame is shown
+# (used by benchmarks/bench_startup.py).
+EXIT_AFTER_STARTUP = os.environ.get("EXPENSE_TRACKER_EXIT_AFTER_STARTUP") == "1"
     
 # --- GLOBAL VARIABLES & FUNCTIONS ---
+# Widgets of the tabs that are built on first visit
+filter_calendar = None
+table_view = None
+scrollbar = None
+stats_frame = None
+
 global plot_canvas
 plot_canvas = None 
+# Persistent statistics chart state, see show_daily_totals_plot
+plot_axes = None
+plot_bars = None
+plot_dates = None
+plot_no_data_text = None
+plot_drawn_version = None
+PLOT_BUCKET_TITLES = {"day": "Daily", "week": "Weekly", "month": "Monthly", "year": "Yearly"}
 global receipt_text
 receipt_text = ""
 
+# Records tab paging: rows per database page, pages kept in memory and rows per wheel notch.
+RECORDS_PAGE_SIZE = 200
+RECORDS_CACHE_PAGES = 10
+RECORDS_WHEEL_ROWS = 3
+records_view = {"search_date": None, "total": 0, "top": 0, "pages": OrderedDict(), "items": []}
+
+# Receipt OCR runs on worker threads; results come back through ocr_results,
+# which the Tk main loop polls every OCR_POLL_MS.
+OCR_WORKERS = 2
+OCR_POLL_MS = 100
+ocr_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="receipt-ocr")
+ocr_results = queue.Queue()
+ocr_state = {"futures": [], "total": 0, "done": 0, "batch": 0, "polling": False, "show_names": False}
+
 
 def show_daily_totals_plot():
     """
-    Fetches daily totals from the database and displays them as a bar graph.
+    Shows expense totals as a bar graph. The figure and canvas are built once;
+    later calls only update the bars, and only when the expenses data has
+    changed since the last draw.
     """
-    global plot_canvas
-    
-    # 1. Clear any existing plot and widgets in the stats frame
-    if plot_canvas:
-        plot_canvas.get_tk_widget().destroy()
-        plt.close('all') # Close all existing matplotlib figures
-        plot_canvas = None
-
-    for widget in stats_frame.winfo_children():
-        widget.destroy()
-
-    # 2. Fetch data from the database using the new CRUD function
-    records = get_daily_totals()
+    global plot_bars, plot_dates, plot_drawn_version
 
-    if not records:
-        no_data_label = ctk.CTkLabel(stats_frame, text="No daily totals found to display.", font=("Helvetica", 16))
-        no_data_label.pack(pady=20)
+    version = get_expenses_version()
+    if plot_canvas is not None and version == plot_drawn_version:
         return
 
+    if plot_canvas is None:
+        create_daily_totals_plot()
+
+    # Pick daily, weekly, monthly or yearly bars so the whole range fits on the chart.
+    bucket = pick_bucket(*get_date_range())
+    records = get_totals(bucket)
     dates = [row[0] for row in records]
     totals = [row[1] for row in records]
-    
-    # 3. Create the plot
-    plt.style.use('dark_background')
-    fig, ax = plt.subplots(figsize=(6, 5), dpi=100)
-    fig.patch.set_facecolor('#2b2d2e')
-    ax.set_facecolor('#2b2d2e')
-    
-    ax.bar(dates, totals, color='#0078b6')
-    ax.set_title("Daily Expense Totals", color='white')
-    ax.set_xlabel("Date", color='white')
-    ax.set_ylabel("Total Amount ($)", color='white')
-    
+
+    # Update the bar heights in place when the dates are unchanged,
+    # otherwise replace the bars on the same axes.
+    if plot_bars is not None and dates == plot_dates:
+        for bar, total in zip(plot_bars, totals):
+            bar.set_height(total)
+    else:
+        if plot_bars is not None:
+            plot_bars.remove()
+        # Numeric positions with date labels, so dates that disappear do not
+        # linger as empty categories on the axis.
+        positions = range(len(dates))
+        plot_bars = plot_axes.bar(positions, totals, color='#0078b6')
+        plot_axes.set_xticks(positions, labels=dates)
+        plot_dates = dates
+
+    plot_no_data_text.set_visible(not records)
+    plot_axes.set_title(f"{PLOT_BUCKET_TITLES[bucket]} Expense Totals", color='white')
     if len(dates) > 5:
-        plt.xticks(rotation=45, ha='right', color='white')
+        plot_axes.tick_params(axis='x', labelrotation=45)
+        for label in plot_axes.get_xticklabels():
+            label.set_horizontalalignment('right')
     else:
-        plt.xticks(rotation=0, color='white')
-    
-    plt.yticks(color='white')
-    plt.tight_layout()
-    
-    # 4. Embed the plot in the Tkinter window
+        plot_axes.tick_params(axis='x', labelrotation=0)
+
+    plot_axes.relim()
+    plot_axes.autoscale_view()
+    plot_canvas.figure.tight_layout()
+    plot_canvas.draw_idle()
+    plot_drawn_version = version
+
+
+def create_daily_totals_plot():
+    """
+    Builds the persistent statistics figure and embeds it in the stats frame.
+    """
+    global plot_canvas, plot_axes, plot_no_data_text
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+    fig = Figure(figsize=(6, 5), dpi=100)
+    fig.patch.set_facecolor('#2b2d2e')
+    plot_axes = fig.add_subplot()
+    plot_axes.set_facecolor('#2b2d2e')
+    plot_axes.set_title("Daily Expense Totals", color='white')
+    plot_axes.set_xlabel("Period", color='white')
+    plot_axes.set_ylabel("Total Amount ($)", color='white')
+    plot_axes.tick_params(colors='white')
+    for spine in plot_axes.spines.values():
+        spine.set_color('white')
+    plot_no_data_text = plot_axes.text(0.5, 0.5, "No daily totals found to display.", color='white',
+                                       fontsize=14, ha='center', va='center', transform=plot_axes.transAxes)
+
     plot_canvas = FigureCanvasTkAgg(fig, master=stats_frame)
-    plot_canvas.draw()
     plot_canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
 
 def on_tab_change(event):
     """
     Handles tab changes in the notebook to load the correct data.
+    Tabs other than the first are built the first time they are opened.
     """
     selected_tab_text = notebook1.tab(notebook1.select(), "text")
     if selected_tab_text == "Records":
+        if table_view is None:
+            build_records_tab()
         update_records_treeview()
     elif selected_tab_text == "Statistics":
+        if stats_frame is None:
+            build_statistics_tab()
         show_daily_totals_plot()
 
 
 def select_receipt():
     """
-    Prompts the user to select an image file (receipt) and displays the OCR text.
+    Prompts the user to select one or more receipt images and queues them for
+    OCR on the worker threads. The text of each receipt is shown as it finishes.
     """
-    global receipt_text
-    filepath = filedialog.askopenfilename(
+    filepaths = filedialog.askopenfilenames(
         initialdir="/",
-        title="Select a file",
+        title="Select receipts",
         filetypes=(("Image files", "*.png;*.jpg;*.jpeg"), ("All files", "*.*"))
         )
-    if filepath:
-        img = Image.open(filepath)
-        receipt_text = pytesseract.image_to_string(img)
-        output_textbox.delete("1.0", "end")
-        output_textbox.insert("end", receipt_text)
+    if not filepaths:
+        return
 
-def parse_receipt(text):
+    if ocr_state["total"] == ocr_state["done"]:
+        # Nothing is pending, so this is a fresh selection.
+        output_textbox.delete("1.0", "end")
+        ocr_state["total"] = ocr_state["done"] = 0
+        ocr_state["futures"] = []
+
+    batch = ocr_state["batch"]
+    for filepath in filepaths:
+        future = ocr_executor.submit(ocr_receipt_file, filepath)
+        future.add_done_callback(lambda f, path=filepath: ocr_results.put((batch, path, f)))
+        ocr_state["futures"].append(future)
+    ocr_state["total"] += len(filepaths)
+    ocr_state["show_names"] = ocr_state["total"] > 1
+
+    update_ocr_progress()
+    if not ocr_state["polling"]:
+        ocr_state["polling"] = True
+        root.after(OCR_POLL_MS, poll_ocr_results)
+
+def ocr_receipt_file(filepath):
     """
-    Parses the OCR text from a receipt to find the total amount.
+    Reads a receipt image and returns its OCR text. Runs on an OCR worker thread.
+    """
+    with open(filepath, "rb") as f:
+        image_data = f.read()
+    return cached_ocr(image_data, run_tesseract, ocr_engine.OCR_ENGINE_VERSION)
+
+def poll_ocr_results():
     """
-=======
-    It now has a two-step approach for better accuracy.
+    Moves finished OCR results from the worker threads into the UI.
+    Reschedules itself with root.after while receipts are still pending.
     """
-    # Attempt 1: Look for keywords like "total", "grand total", etc.
-    keyword_pattern = r'(?:total|grand total|balance due|amount)\s*\D*(\d+\.?\d{2})'
-    found_amounts = re.findall(keyword_pattern, text, re.IGNORECASE)
-    
-    if found_amounts:
-        return float(found_amounts[-1])
+    global receipt_text
+    while not ocr_results.empty():
+        batch, filepath, future = ocr_results.get_nowait()
+        if batch != ocr_state["batch"] or future.cancelled():
+            continue
+        ocr_state["done"] += 1
+        try:
+            text = future.result()
+        except Exception as e:
+            text = f"[Error] Could not read {os.path.basename(filepath)}: {e}"
+        else:
+            receipt_text = text
+        if ocr_state["show_names"]:
+            text = f"--- {os.path.basename(filepath)} ---\n{text}\n"
+        output_textbox.insert("end", text)
+
+    update_ocr_progress()
+    if ocr_state["done"] < ocr_state["total"]:
+        root.after(OCR_POLL_MS, poll_ocr_results)
     else:
-        # If a keyword is found, return the last number found.
-        return float(found_amounts[-1])
+        ocr_state["polling"] = False
+
+def cancel_ocr():
+    """
+    Cancels the receipts that have not started yet and discards the results
+    of the ones still running.
+    """
+    for future in ocr_state["futures"]:
+        future.cancel()
+    ocr_state["batch"] += 1
+    ocr_state["futures"] = []
+    ocr_state["total"] = ocr_state["done"] = 0
+    update_ocr_progress()
+
+def update_ocr_progress():
+    """
+    Refreshes the OCR progress bar, status label and cancel button.
+    """
+    total = ocr_state["total"]
+    done = ocr_state["done"]
+    if total and done < total:
+        ocr_progress_bar.set(done / total)
+        ocr_status_label.configure(text=f"Reading receipts: {done} of {total} done")
+        cancel_ocr_button.configure(state="normal")
     else:
-        # Attempt 2 (Fallback): Find a currency symbol (RM, S$, MYR, etc.) and pick the largest number after it.
-        # This handles receipts without "Total" keywords and ignores account numbers.
-        currency_pattern = r'\b(?:RM|MYR|S\$|USD|SGD|€)\s*(\d+\.?\d{2})'
-        all_currency_amounts = re.findall(currency_pattern, text, re.IGNORECASE)
-        
-        if all_currency_amounts:
-            return max(float(n) for n in all_currency_amounts)
-        else:
-            return None
+        ocr_progress_bar.set(1 if total else 0)
+        ocr_status_label.configure(text=f"Read {total} receipt(s)" if total else "")
+        cancel_ocr_button.configure(state="disabled")
+
+def run_tesseract(image_data):
+    """
+    Runs Tesseract on raw image bytes, after the shared preprocessing stage,
+    on one of the warm ocr_engine workers.
+    """
+    return ocr_engine.recognize(image_data)
+
+def parse_receipt(text):
+    """
+    Parses the OCR text from a receipt to find the total amount.
+    Uses the same single-pass parser as the Flask API.
+    """
+    total, line, source = find_total(text)
+    return total
 
 def split_text_and_numbers(user_input):
     pattern = re.compile(r'(\d+\.?\d*|\D+)')
     return pattern.findall(user_input)
 
-            # Convert to floats and return the maximum value.
-            return max(float(n) for n in all_currency_amounts)
-        else:
-            return None
-
 def parsing_and_display():
     """
     This function gets the text, parses it, saves it to the DB, and displays the result.
@@ -188,19 +311,116 @@ def parsing_and_display():
 
 def update_records_treeview(search_date=None):
     """
-    This function fetches expenses from the database and updates the Treeview.
+    This function resets the Records view and shows the first rows.
     It can be called with an optional search_date to filter the records.
+    Only the rows in the viewport are ever inserted into the Treeview.
     """
-    # Clear existing data in the Treeview
-    for record in table_view.get_children():
-        table_view.delete(record)
-    
-    # Load data from the database (filtered or all)
-    data = load_expenses(search_date=search_date)
+    if table_view is None:
+        # The Records tab has not been opened yet; it loads when it is.
+        return
+    records_view["search_date"] = search_date
+    records_view["total"] = count_expenses(search_date=search_date)
+    records_view["top"] = 0
+    records_view["pages"].clear()
+    render_records()
+
+
+def get_records_page(page):
+    """
+    Returns one page of records for the current filter, from the cache or the database.
+    A page that follows a cached page is loaded with a keyset query, any other page by offset.
+    """
+    pages = records_view["pages"]
+    if page in pages:
+        pages.move_to_end(page)
+        return pages[page]
+
+    previous = pages.get(page - 1)
+    if previous:
+        last = previous[-1]
+        rows = load_expenses(search_date=records_view["search_date"], after=(last[0], last[3]),
+                             limit=RECORDS_PAGE_SIZE)
+    else:
+        rows = load_expenses(search_date=records_view["search_date"], limit=RECORDS_PAGE_SIZE,
+                             offset=page * RECORDS_PAGE_SIZE)
+
+    pages[page] = rows
+    while len(pages) > RECORDS_CACHE_PAGES:
+        pages.popitem(last=False)
+    return rows
+
+
+def get_record_rows(start, count):
+    """
+    Returns the records at positions start to start + count for the current filter.
+    """
+    rows = []
+    page = start // RECORDS_PAGE_SIZE
+    index = start % RECORDS_PAGE_SIZE
+    while len(rows) < count:
+        page_rows = get_records_page(page)
+        rows.extend(page_rows[index:index + count - len(rows)])
+        if len(page_rows) < RECORDS_PAGE_SIZE:
+            break
+        page += 1
+        index = 0
+    return rows
+
+
+def render_records():
+    """
+    Writes the rows in the viewport into the recycled Treeview items and
+    moves the scrollbar to match, then prefetches the next page in the background.
+    """
+    visible = int(table_view.cget("height"))
+    total = records_view["total"]
+    top = max(0, min(records_view["top"], total - visible))
+    records_view["top"] = top
+
+    # Create the pool of row items once and reuse it for every window.
+    while len(records_view["items"]) < visible:
+        records_view["items"].append(table_view.insert("", "end", values=("", "", "")))
+
+    rows = get_record_rows(top, visible)
+    for position, item in enumerate(records_view["items"]):
+        if position < len(rows):
+            record = rows[position]
+            table_view.item(item, values=(record[0], record[1], f"${record[2]:.2f}"))
+            table_view.move(item, "", position)
+        else:
+            table_view.detach(item)
 
-    # Insert new data into the Treeview
-    for record in data:
-        table_view.insert("", "end", values=(record[0], record[1], f"${record[2]:.2f}"))
+    if total:
+        scrollbar.set(top / total, min(1.0, (top + visible) / total))
+    else:
+        scrollbar.set(0.0, 1.0)
+
+    next_page = (top + visible) // RECORDS_PAGE_SIZE + 1
+    if next_page * RECORDS_PAGE_SIZE < total and next_page not in records_view["pages"]:
+        root.after_idle(get_records_page, next_page)
+
+
+def scroll_records(rows):
+    """
+    Moves the Records viewport by a number of rows (negative scrolls up).
+    """
+    records_view["top"] += rows
+    render_records()
+
+
+def on_records_scrollbar(*args):
+    """
+    Scrollbar command for the Records view. Accepts ("moveto", fraction)
+    and ("scroll", n, "units" | "pages") like a Tk scrollbar.
+    """
+    if args[0] == "moveto":
+        records_view["top"] = int(float(args[1]) * records_view["total"])
+        render_records()
+    elif args[0] == "scroll":
+        step = int(args[1])
+        if args[2] == "pages":
+            step *= int(table_view.cget("height"))
+        scroll_records(step)
 
 
 def filter_by_date():
@@ -216,16 +436,12 @@ def filter_by_date():
 
 def on_treeview_scroll(event):
     """
-    Handles mouse wheel events on the treeview.
+    Handles mouse wheel events on the treeview by moving the records window.
     """
     if event.delta > 0:
-        table_view.yview_scroll(-1, "units")
-
-        Output.insert("end", f"Total Amount Found: ${parsed_total:.2f}")
-        save_expense(parsed_total)
-        load_expenses()
+        scroll_records(-RECORDS_WHEEL_ROWS)
     else:
-        table_view.yview_scroll(1, "units")
+        scroll_records(RECORDS_WHEEL_ROWS)
     return "break"
 
 # --- UI COMPONENTS ---
@@ -260,6 +476,16 @@ label.pack(pady=(0, 20))
 select_recipt_button = ctk.CTkButton(add_expense_scrollable_frame, text="Select a receipt", font=("Helvetica", 16), command=select_receipt)
 select_recipt_button.pack(pady=(10, 5))
 
+ocr_progress_bar = ctk.CTkProgressBar(add_expense_scrollable_frame, width=300)
+ocr_progress_bar.set(0)
+ocr_progress_bar.pack(pady=(5, 0))
+
+ocr_status_label = ctk.CTkLabel(add_expense_scrollable_frame, text="", font=("Helvetica", 12))
+ocr_status_label.pack()
+
+cancel_ocr_button = ctk.CTkButton(add_expense_scrollable_frame, text="Cancel", font=("Helvetica", 14), command=cancel_ocr, width=100, state="disabled")
+cancel_ocr_button.pack(pady=(0, 5))
+
 manual_entry_label = ctk.CTkLabel(add_expense_scrollable_frame, text="Or type in manually", font=("Helvetica", 16))
 manual_entry_label.pack(pady=(10, 5))
 
@@ -277,143 +503,107 @@ add_expense_calendar.pack(pady=5)
 
 
 # --- Frame 2: Records ---
-records_scrollable_frame = ctk.CTkScrollableFrame(frame2)
-records_scrollable_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-# Filter UI Frame
-filter_frame = ctk.CTkFrame(records_scrollable_frame)
-filter_frame.pack(pady=10, padx=10, fill="x")
+def build_records_tab():
+    """
+    Builds the Records tab. Called the first time the tab is opened.
+    """
+    global filter_calendar, table_view, scrollbar
 
-calendar_label = ctk.CTkLabel(filter_frame, text="Filter by Date", font=("Helvetica", 16, "bold"))
-calendar_label.pack(side="left", padx=(10,5))
+    records_scrollable_frame = ctk.CTkScrollableFrame(frame2)
+    records_scrollable_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-filter_calendar = Calendar(filter_frame, selectmode='day', font="Helvetica 12", date_pattern='y-mm-dd')
-filter_calendar.pack(side="left", padx=5)
+    # Filter UI Frame
+    filter_frame = ctk.CTkFrame(records_scrollable_frame)
+    filter_frame.pack(pady=10, padx=10, fill="x")
 
-search_date_button = ctk.CTkButton(filter_frame, text="Search", font=("Helvetica", 14), command=filter_by_date, width=100)
-search_date_button.pack(side="left", padx=5)
+    calendar_label = ctk.CTkLabel(filter_frame, text="Filter by Date", font=("Helvetica", 16, "bold"))
+    calendar_label.pack(side="left", padx=(10,5))
 
-show_all_button = ctk.CTkButton(filter_frame, text="Show All", font=("Helvetica", 14), command=lambda: update_records_treeview(), width=100)
-show_all_button.pack(side="left", padx=5)
+    filter_calendar = Calendar(filter_frame, selectmode='day', font="Helvetica 12", date_pattern='y-mm-dd')
+    filter_calendar.pack(side="left", padx=5)
 
-# Treeview Table UI
-table_label = ctk.CTkLabel(records_scrollable_frame, text="All Expenses", font=("Helvetica", 20, "bold"))
-table_label.pack(pady=(20, 5))
+    search_date_button = ctk.CTkButton(filter_frame, text="Search", font=("Helvetica", 14), command=filter_by_date, width=100)
+    search_date_button.pack(side="left", padx=5)
 
-style = ttk.Style()
-style.theme_use("default")
-style.configure("Treeview",
-                background="#2b2d2e",
-                foreground="#fff",
-                rowheight=25,
-                fieldbackground="#2b2d2e",
-                bordercolor="#333333",
-                font=("Helvetica", 12))
-style.map('Treeview',
-          background=[('selected', '#0078b6')])
-style.configure("Treeview.Heading",
-                font=("Helvetica", 12, "bold"),
-                background="#1f1f1f",
-                foreground="#fff")
+    show_all_button = ctk.CTkButton(filter_frame, text="Show All", font=("Helvetica", 14), command=lambda: update_records_treeview(), width=100)
+    show_all_button.pack(side="left", padx=5)
 
-table_frame = ctk.CTkFrame(records_scrollable_frame)
-table_frame.pack(pady=5, padx=20, fill="both", expand=True)
+    # Treeview Table UI
+    table_label = ctk.CTkLabel(records_scrollable_frame, text="All Expenses", font=("Helvetica", 20, "bold"))
+    table_label.pack(pady=(20, 5))
 
-table_view = ttk.Treeview(table_frame, columns=("Date", "Description", "Amount"), show="headings", height=15)
-table_view.pack(side="left", fill="both", expand=True)
+    style = ttk.Style()
+    style.theme_use("default")
+    style.configure("Treeview",
+                    background="#2b2d2e",
+                    foreground="#fff",
+                    rowheight=25,
+                    fieldbackground="#2b2d2e",
+                    bordercolor="#333333",
+                    font=("Helvetica", 12))
+    style.map('Treeview',
+              background=[('selected', '#0078b6')])
+    style.configure("Treeview.Heading",
+                    font=("Helvetica", 12, "bold"),
+                    background="#1f1f1f",
+                    foreground="#fff")
 
-table_view.bind("<MouseWheel>", on_treeview_scroll)
+    table_frame = ctk.CTkFrame(records_scrollable_frame)
+    table_frame.pack(pady=5, padx=20, fill="both", expand=True)
 
-table_view.heading("Date", text="Date")
-table_view.heading("Description", text="Description")
-table_view.heading("Amount", text="Amount")
+    table_view = ttk.Treeview(table_frame, columns=("Date", "Description", "Amount"), show="headings", height=15)
+    table_view.pack(side="left", fill="both", expand=True)
 
-table_view.column("Date", width=150, anchor="center")
-table_view.column("Description", width=250, anchor="w")
-table_view.column("Amount", width=100, anchor="e")
+    table_view.bind("<MouseWheel>", on_treeview_scroll)
+    table_view.bind("<Button-4>", lambda event: scroll_records(-RECORDS_WHEEL_ROWS))
+    table_view.bind("<Button-5>", lambda event: scroll_records(RECORDS_WHEEL_ROWS))
 
-scrollbar = ctk.CTkScrollbar(table_frame, command=table_view.yview)
-scrollbar.pack(side="right", fill="y")
-table_view.configure(yscrollcommand=scrollbar.set)
+    table_view.heading("Date", text="Date")
+    table_view.heading("Description", text="Description")
+    table_view.heading("Amount", text="Amount")
 
-# --- Frame 3: Statistics ---
-statistics_scrollable_frame = ctk.CTkScrollableFrame(frame3)
-statistics_scrollable_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-stats_label = ctk.CTkLabel(statistics_scrollable_frame, text="Daily Totals", font=("Helvetica", 24, "bold"))
-stats_label.pack(pady=(0, 20))
-parse_text = ctk.CTkButton(root, text="Parse", font=("Helventica", 20), command=parsing_and_display)
-parse_text.pack()
+    table_view.column("Date", width=150, anchor="center")
+    table_view.column("Description", width=250, anchor="w")
+    table_view.column("Amount", width=100, anchor="e")
 
-stats_frame = ctk.CTkFrame(statistics_scrollable_frame)
-stats_frame.pack(fill="both", expand=True)
+    # The scrollbar spans all records, not just the rows inserted into the Treeview
+    scrollbar = ctk.CTkScrollbar(table_frame, command=on_records_scrollbar)
+    scrollbar.pack(side="right", fill="y")
 
-# Initial setup: call the database setup and load expenses on app startup
-setup_database()
-update_records_treeview()
-
-root.mainloop()
-# --- DATABASE SETUP AND FUNCTIONS ---
-def setup_database():
-    conn = sqlite3.connect('expenses.db')
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS expenses (
-            date TEXT,
-            description TEXT,
-            amount REAL
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def save_expense(amount, description="Receipt from OCR"):
-    conn = sqlite3.connect('expenses.db')
-    cursor = conn.cursor()
-    current_date = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor.execute("INSERT INTO expenses (date, description, amount) VALUES (?, ?, ?)",
-                   (current_date, description, amount))
-    conn.commit()
-    conn.close()
-    
-def load_expenses():
-    conn = sqlite3.connect('expenses.db')
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM expenses ORDER BY amount DESC")
-    records = cursor.fetchall()
-    conn.close()
-    
-    # Clear the old data from the treeview
-    for record in table_view.get_children():
-        table_view.delete(record)
-    
-    # Add each record to the table view
-    for record in records:
-        table_view.insert("", "end", values=record)
 
+# --- Frame 3: Statistics ---
+def build_statistics_tab():
+    """
+    Builds the Statistics tab. Called the first time the tab is opened.
+    """
+    global stats_frame
 
-table_label = ctk.CTkLabel(root, text="All Expenses", font=("Helvetica", 20, "bold"))
-table_label.pack(pady=(10, 5))
+    statistics_scrollable_frame = ctk.CTkScrollableFrame(frame3)
+    statistics_scrollable_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-table_frame = ctk.CTkFrame(root)
-table_frame.pack(pady=5, padx=20, fill="x", expand=True)
+    stats_label = ctk.CTkLabel(statistics_scrollable_frame, text="Daily Totals", font=("Helvetica", 24, "bold"))
+    stats_label.pack(pady=(0, 20))
 
-table_view = ttk.Treeview(table_frame, columns=("Date", "Description", "Amount"), show="headings")
-table_view.pack(side="left", fill="both", expand=True)
+    stats_frame = ctk.CTkFrame(statistics_scrollable_frame)
+    stats_frame.pack(fill="both", expand=True)
 
-table_view.heading("Date", text="Date")
-table_view.heading("Description", text="Description")
-table_view.heading("Amount", text="Amount")
+parse_text = ctk.CTkButton(root, text="Parse", font=("Helventica", 20), command=parsing_and_display)
+parse_text.pack()
 
-table_view.column("Date", width=150, anchor="center")
-table_view.column("Description", width=250, anchor="w")
-table_view.column("Amount", width=100, anchor="e")
 
-scrollbar = ctk.CTkScrollbar(table_frame, command=table_view.yview)
-scrollbar.pack(side="right", fill="y")
-table_view.configure(yscrollcommand=scrollbar.set)
+def finish_startup():
+    """
+    Initial setup that can wait until the window has been drawn once.
+    """
+    setup_database()
+    setup_cache()
+    if EXIT_AFTER_STARTUP:
+        print(f"Startup: first frame after {(time.perf_counter() - STARTUP_STARTED) * 1000:.1f} ms")
+        heavy_modules = ("matplotlib", "numpy", "PIL", "pytesseract", "tesserocr")
+        print("Heavy modules loaded: " + (", ".join(m for m in heavy_modules if m in sys.modules) or "none"))
+        root.destroy()
 
-setup_database()
-load_expenses()
 
+# Initial setup: the window is shown first, then the database is set up
+root.after_idle(finish_startup)
 root.mainloop()
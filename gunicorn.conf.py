@@ -0,0 +1,58 @@
+# Production server settings for the receipt API.
+# Run with:  gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5000")
+
+# Receipt parsing is CPU bound, so one worker process per core. Each worker
+# also runs threads so slow clients and SSE streams don't hold a core. Every
+# request that can hold a thread for long is admitted through a limit in
+# API.py: receipts (OCR_MAX_IN_FLIGHT plus OCR_MAX_WAITING), batches
+# (BATCH_MAX_REQUESTS) and job event streams (JOB_EVENTS_MAX_STREAMS). The
+# thread count stays above all of them together, so the health check and
+# cheap endpoints always find a free thread, however deep the backlog.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+long_request_threads = (
+    int(os.environ.get("OCR_MAX_IN_FLIGHT", 4))
+    + int(os.environ.get("OCR_MAX_WAITING", 4))
+    + int(os.environ.get("BATCH_MAX_REQUESTS", 2))
+    + int(os.environ.get("JOB_EVENTS_MAX_STREAMS", 4))
+)
+threads = int(os.environ.get("WORKER_THREADS", long_request_threads + 4))
+
+# Import the app (parser patterns, image libraries, database schema) once in
+# the master so workers fork with it already loaded.
+preload_app = True
+
+# Recycle workers gracefully after a number of requests, with jitter so they
+# don't all restart at once, to bound memory growth from image decoding.
+max_requests = int(os.environ.get("MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", 200))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def pre_fork(server, worker):
+    """
+    SQLite connections must not be shared across fork, so close the ones
+    the master opened while preloading; each worker opens its own.
+    """
+    from connection import close_connections
+
+    close_connections()
+
+
+def post_worker_init(worker):
+    """
+    Gets the OCR backend ready in each worker (e.g. loads the Tesseract
+    models). Threads do not survive fork, so this cannot run in the master.
+    """
+    import API
+
+    API.ocr_backend.warm_up()
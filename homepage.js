@@ -1,25 +1,9 @@
-// --- 1. MOCK DATA SETUP AND STATE ---
-const data = {
-    'week': {
-        income: 1500.00,
-        expense: 450.50,
-        transactions: [
-            { item: 'Food and drinks', amount: 85.00, date: '25/11/2067', type: 'expense' },
-            { item: 'Entertainment', amount: 15.00, date: '24/11/2067', type: 'expense' },
-            { item: 'Gambling', amount: 1000.00, date: '23/11/2067', type: 'income' },
-        ]
-    },
-    'month': {
-        income: 6200.00,
-        expense: 2800.75,
-        transactions: [
-            { item: 'Gambling Debts', amount: 20000.00, date: '01/11/2025', type: 'expense' },
-            { item: 'Salary Deposit', amount: 5000.00, date: '31/10/2025', type: 'income' },
-            { item: 'Utilities', amount: 250.75, date: '10/11/2025', type: 'expense' },
-            { item: 'Takeout Dinner', amount: 75.00, date: '26/11/2025', type: 'expense' },
-        ]
-    }
-};
+// --- 1. DATA SETUP AND STATE ---
+// Summaries come from the receipt API's /api/summary endpoint.
+const API_BASE_URL = 'http://localhost:5000';
+const data = {};
+// ETag of each view's summary, so unchanged data is answered with a 304.
+const etags = {};
 
 let currentView = 'week'; 
 
@@ -29,7 +13,13 @@ let currentView = 'week';
  * Updates the metrics, table, and button styles based on the current view data.
  * @param {string} viewKey - 'week' or 'month'
  */
-function updateDashboard (viewKey) {
+async function updateDashboard (viewKey) {
+    try {
+        await loadSummary(viewKey);
+    } catch (error) {
+        console.error(`Could not load the ${viewKey} summary:`, error);
+        if (!data[viewKey]) return;
+    }
     const viewData = data[viewKey];
     const totalLeft = viewData.income - viewData.expense;
     
@@ -54,6 +44,31 @@ function updateDashboard (viewKey) {
 }
 
 
+/**
+ * Fetches the summary for a view into data[viewKey], unless the server
+ * says the copy we already have is still current.
+ * @param {string} viewKey - 'week' or 'month'
+ */
+async function loadSummary (viewKey) {
+    const headers = etags[viewKey] ? { 'If-None-Match': etags[viewKey] } : {};
+    const response = await fetch(`${API_BASE_URL}/api/summary?view=${viewKey}`, { headers });
+    if (response.status === 304 && data[viewKey]) return;
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+    const body = await response.json();
+    data[viewKey] = body.data;
+    etags[viewKey] = response.headers.get('ETag');
+}
+
+/**
+ * Formats a 'YYYY-MM-DD' date as 'DD/MM/YYYY'.
+ */
+function formatDate (isoDate) {
+    const [year, month, day] = isoDate.split('-');
+    return `${day}/${month}/${year}`;
+}
+
+
 // --- 3. RENDER TRANSACTIONS FUNCTION (SITS GLOBALLY) ---
 
 /**
@@ -70,11 +85,19 @@ function renderTransactions(transactions) {
         // Use the type property ('income' or 'expense') for color-coding the amount
         const amountColor = tx.type === 'income' ? '#1B5E20' : '#B71C1C'; 
         
-        row.innerHTML = `
-            <td>${tx.item}</td>
-            <td style="color: ${amountColor};">${tx.amount.toFixed(2)}</td>
-            <td>${tx.date}</td>
-        `;
+        // Descriptions come from user input, so cells are filled with
+        // textContent and never parsed as HTML.
+        const itemCell = document.createElement('td');
+        itemCell.textContent = tx.item;
+
+        const amountCell = document.createElement('td');
+        amountCell.style.color = amountColor;
+        amountCell.textContent = tx.amount.toFixed(2);
+
+        const dateCell = document.createElement('td');
+        dateCell.textContent = formatDate(tx.date);
+
+        row.append(itemCell, amountCell, dateCell);
         tbody.appendChild(row);
     });
 }
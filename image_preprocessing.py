@@ -0,0 +1,190 @@
+import io
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from uploads import BufferReader
+
+# Receipts are OCR'd at this resolution. Tesseract does best around 300 DPI
+# and its run time grows with the pixel count, so larger scans are shrunk.
+TARGET_DPI = 300
+# Used when the image carries no DPI metadata (e.g. phone photos).
+MAX_LONG_SIDE = 2200
+# Adaptive threshold neighbourhood (pixels, odd) and how far below the local
+# mean a pixel must be to count as ink.
+THRESHOLD_BLOCK_SIZE = 31
+THRESHOLD_OFFSET = 10
+# Deskew searches this many degrees either way, in DESKEW_STEP increments.
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+DESKEW_SAMPLE_SIDE = 800
+# Text line detection: a row is part of a line when at least this share of it
+# is ink, and lines closer than LINE_GAP rows are merged.
+LINE_MIN_INK = 0.005
+LINE_GAP = 2
+# The totals region is the lower part of the text block, as a share of its
+# height, with LINE_MARGIN rows of padding around it.
+TOTALS_REGION_FRACTION = 0.4
+TOTALS_REGION_MIN_LINES = 6
+LINE_MARGIN = 6
+
+
+def preprocess_image(image_data):
+    """
+    Prepares raw image bytes for OCR: EXIF rotation, grayscale, downscale,
+    adaptive threshold and deskew. Any bytes-like buffer works and is read
+    without copying. Returns (image, timings) where image is a black-on-white
+    PIL image and timings maps each step to its seconds.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    with BufferReader(image_data) as reader:
+        image = Image.open(reader)
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    timings["exif_rotate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image = image.convert("L")
+    timings["grayscale"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image = downscale(image)
+    timings["downscale"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    binary = adaptive_threshold(np.asarray(image))
+    timings["threshold"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    image = deskew(Image.fromarray(binary))
+    timings["deskew"] = time.perf_counter() - started
+
+    return image, timings
+
+
+def prepare_for_ocr(image_data):
+    """
+    Runs preprocess_image and encodes the result as PNG bytes, for OCR
+    services that take an uploaded file. Returns (png_bytes, timings).
+    """
+    image, timings = preprocess_image(image_data)
+    started = time.perf_counter()
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    timings["encode"] = time.perf_counter() - started
+    return buffer.getvalue(), timings
+
+
+def downscale(image):
+    """
+    Shrinks the image to TARGET_DPI, or to MAX_LONG_SIDE when the DPI is unknown.
+    Images that are already small enough are returned unchanged.
+    """
+    dpi = image.info.get("dpi")
+    if dpi and dpi[0] and dpi[0] > TARGET_DPI:
+        scale = TARGET_DPI / float(dpi[0])
+    else:
+        scale = MAX_LONG_SIDE / float(max(image.size))
+    if scale >= 1:
+        return image
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+
+
+def adaptive_threshold(gray, block_size=THRESHOLD_BLOCK_SIZE, offset=THRESHOLD_OFFSET):
+    """
+    Binarizes a grayscale array against the mean of each pixel's neighbourhood,
+    which copes with shadows and uneven lighting. The local means come from an
+    integral image, so the cost does not depend on block_size.
+    Returns a uint8 array with 0 for ink and 255 for background.
+    """
+    height, width = gray.shape
+    integral = np.zeros((height + 1, width + 1), dtype=np.int64)
+    integral[1:, 1:] = gray.astype(np.int64).cumsum(axis=0).cumsum(axis=1)
+
+    radius = block_size // 2
+    rows = np.arange(height)
+    cols = np.arange(width)
+    top = np.clip(rows - radius, 0, height)
+    bottom = np.clip(rows + radius + 1, 0, height)
+    left = np.clip(cols - radius, 0, width)
+    right = np.clip(cols + radius + 1, 0, width)
+
+    sums = (integral[bottom][:, right] - integral[top][:, right]
+            - integral[bottom][:, left] + integral[top][:, left])
+    counts = np.outer(bottom - top, right - left)
+    # Compare gray * counts with sums - offset * counts to stay in integers.
+    is_background = gray.astype(np.int64) * counts > sums - offset * counts
+    return np.where(is_background, 255, 0).astype(np.uint8)
+
+
+def find_skew_angle(binary_image):
+    """
+    Estimates the text skew in degrees with a projection profile: text lines
+    give the sharpest row-by-row ink profile when they are horizontal.
+    """
+    sample = binary_image
+    if max(sample.size) > DESKEW_SAMPLE_SIDE:
+        sample = sample.copy()
+        sample.thumbnail((DESKEW_SAMPLE_SIDE, DESKEW_SAMPLE_SIDE))
+    ink = ImageOps.invert(sample)
+
+    best_angle = 0.0
+    best_score = -1.0
+    steps = int(DESKEW_MAX_ANGLE / DESKEW_STEP)
+    for step in range(-steps, steps + 1):
+        angle = step * DESKEW_STEP
+        profile = np.asarray(ink.rotate(angle, resample=Image.NEAREST, fillcolor=0), dtype=np.int64).sum(axis=1)
+        score = float(np.square(np.diff(profile)).sum())
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def deskew(binary_image):
+    """
+    Rotates a binarized receipt so that its text lines are horizontal.
+    """
+    angle = find_skew_angle(binary_image)
+    if angle == 0:
+        return binary_image
+    return binary_image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def find_text_lines(binary_image):
+    """
+    Locates text lines in a binarized, deskewed image from its row-by-row
+    ink profile, without any OCR. Returns a list of (top, bottom) row
+    ranges, bottom exclusive, from top to bottom.
+    """
+    ink = np.asarray(binary_image) < 128
+    min_ink = max(1, int(ink.shape[1] * LINE_MIN_INK))
+    rows = np.flatnonzero(ink.sum(axis=1) >= min_ink)
+    if rows.size == 0:
+        return []
+    # Split wherever consecutive inked rows are more than LINE_GAP apart.
+    breaks = np.flatnonzero(np.diff(rows) > LINE_GAP)
+    tops = np.concatenate(([rows[0]], rows[breaks + 1]))
+    bottoms = np.concatenate((rows[breaks], [rows[-1]])) + 1
+    return list(zip(tops.tolist(), bottoms.tolist()))
+
+
+def crop_totals_region(binary_image, fraction=TOTALS_REGION_FRACTION):
+    """
+    Crops a binarized receipt to the text lines in the lower fraction of
+    its text block, where the total is printed. The crop always runs to the
+    last line, so it is a suffix of the receipt text. Returns None when the
+    receipt has too few lines for cropping to save anything.
+    """
+    lines = find_text_lines(binary_image)
+    if len(lines) < TOTALS_REGION_MIN_LINES:
+        return None
+    block_top = lines[0][0]
+    block_bottom = lines[-1][1]
+    cutoff = block_bottom - (block_bottom - block_top) * fraction
+    top = next(line_top for line_top, line_bottom in lines if line_bottom > cutoff)
+    box = (0, max(0, top - LINE_MARGIN), binary_image.width, min(binary_image.height, block_bottom + LINE_MARGIN))
+    return binary_image.crop(box)
@@ -0,0 +1,117 @@
+import csv
+import json
+import os
+import sys
+import time
+
+from CRUD import setup_database, save_expenses_bulk, is_valid_date, is_valid_amount
+
+# Rows per transaction. Larger chunks are faster but hold the write lock longer.
+CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 5000))
+
+
+def read_csv_rows(path):
+    """
+    Streams (date, description, amount) rows out of a CSV file with a
+    header row containing date, description and amount columns.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row.get("date"), row.get("description"), row.get("amount")
+
+
+def read_json_rows(path, read_size=64 * 1024):
+    """
+    Streams (date, description, amount) rows out of a JSON array of objects,
+    or a JSON Lines file, without loading the whole file into memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    with open(path, encoding="utf-8") as f:
+        eof = False
+        while True:
+            # Skip the array brackets, separators and whitespace between objects.
+            buffer = buffer.lstrip(" \t\r\n,[]")
+            if not buffer:
+                if eof:
+                    return
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            yield item.get("date"), item.get("description"), item.get("amount")
+
+
+def chunked(rows, size):
+    """
+    Groups an iterable into lists of at most size items.
+    """
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def valid_rows(rows, skipped):
+    """
+    Drops rows whose date is not in YYYY-MM-DD form or whose amount is not a
+    number the database can store, using the same checks as the API.
+    Every dropped row is counted in skipped["rows"].
+    """
+    for expense_date, description, amount in rows:
+        if not is_valid_date(expense_date) or not is_valid_amount(amount):
+            skipped["rows"] += 1
+            continue
+        yield expense_date, description or "Imported expense", amount
+
+
+def import_file(path, chunk_size=None):
+    """
+    Imports expenses from a .csv, .json or .jsonl file, one transaction per
+    chunk. Returns a dict with the rows imported, rows skipped, elapsed
+    seconds and rows per second.
+    """
+    if path.lower().endswith(".csv"):
+        rows = read_csv_rows(path)
+    elif path.lower().endswith((".json", ".jsonl")):
+        rows = read_json_rows(path)
+    else:
+        raise ValueError(f"Unsupported import file type: {path}")
+
+    skipped = {"rows": 0}
+    imported = 0
+    started = time.perf_counter()
+    for chunk in chunked(valid_rows(rows, skipped), chunk_size or CHUNK_SIZE):
+        imported += save_expenses_bulk(chunk)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "imported": imported,
+        "skipped": skipped["rows"],
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(imported / elapsed) if elapsed > 0 else None,
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python importer.py <expenses.csv|expenses.json|expenses.jsonl>", file=sys.stderr)
+        sys.exit(1)
+    setup_database()
+    stats = import_file(sys.argv[1])
+    print(f"Imported {stats['imported']} rows ({stats['skipped']} skipped) "
+          f"in {stats['seconds']}s, {stats['rows_per_second']} rows/s")
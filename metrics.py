@@ -0,0 +1,110 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process request metrics, rendered in the Prometheus text format by
+# render_metrics(). Each server process keeps its own numbers, so under
+# gunicorn every worker reports only the requests it served.
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+lock = threading.Lock()
+# name -> {"help": text, "type": "histogram" or "counter", "series": {labels: value}}
+# where labels is a sorted tuple of (label, value) pairs. A histogram value is
+# [bucket counts..., count above the last bucket, sum]; a counter value is a number.
+registry = {}
+
+
+def define(name, kind, help_text):
+    """
+    Registers a metric so that it is listed by render_metrics() even before
+    anything was recorded.
+    """
+    with lock:
+        registry.setdefault(name, {"help": help_text, "type": kind, "series": {}})
+
+
+def observe(name, seconds, **labels):
+    """
+    Records one duration in a histogram.
+    """
+    key = tuple(sorted(labels.items()))
+    index = bisect.bisect_left(LATENCY_BUCKETS, seconds)
+    with lock:
+        series = registry[name]["series"]
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        values[index] += 1
+        values[-1] += seconds
+
+
+def increment(name, amount=1, **labels):
+    """
+    Adds to a counter.
+    """
+    key = tuple(sorted(labels.items()))
+    with lock:
+        series = registry[name]["series"]
+        series[key] = series.get(key, 0) + amount
+
+
+@contextmanager
+def timed(name, timings=None, **labels):
+    """
+    Times the with block into the named histogram. When a timings dict is
+    given the elapsed seconds are also stored in it under the "stage" label,
+    so a request can log its own breakdown.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        observe(name, elapsed, **labels)
+        if timings is not None:
+            timings[labels.get("stage", name)] = elapsed
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (label, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for label, value in pairs
+    )
+    return "{" + ",".join(f'{label}="{value}"' for label, value in escaped) + "}"
+
+
+def render_metrics():
+    """
+    Returns every metric in the Prometheus text exposition format.
+    """
+    with lock:
+        snapshot = {
+            name: (metric["help"], metric["type"], {key: (list(value) if isinstance(value, list) else value)
+                                                    for key, value in metric["series"].items()})
+            for name, metric in registry.items()
+        }
+
+    lines = []
+    for name, (help_text, kind, series) in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series.items()):
+            if kind == "counter":
+                lines.append(f"{name}{format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, value):
+                cumulative += count
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {cumulative}")
+            cumulative += value[len(LATENCY_BUCKETS)]
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {value[-1]}")
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,264 @@
+import sqlite3
+
+# Schema migrations for expenses.db. The schema version is stored in
+# PRAGMA user_version; MIGRATIONS[n] upgrades a database from version n to n + 1.
+
+
+def migrate_v0_to_v1(cursor):
+    """
+    The original schema: expenses without a key and daily totals as REAL.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS expenses (
+            date TEXT,
+            description TEXT,
+            amount REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_totals (
+            date TEXT PRIMARY KEY,
+            total REAL
+        )
+    """)
+
+
+def migrate_v1_to_v2(cursor):
+    """
+    Gives expenses an integer primary key, stores amounts as integer cents
+    and adds the date indexes. Existing rows are copied over and the daily
+    totals are rebuilt from them.
+    """
+    cursor.execute("""
+        CREATE TABLE expenses_v2 (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            description TEXT,
+            amount_cents INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO expenses_v2 (date, description, amount_cents)
+        SELECT COALESCE(date, ''), description, CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)
+        FROM expenses
+        ORDER BY rowid
+    """)
+    # Dropping the old tables also drops the REAL-based triggers attached to them.
+    cursor.execute("DROP TABLE expenses")
+    cursor.execute("ALTER TABLE expenses_v2 RENAME TO expenses")
+    cursor.execute("DROP TABLE daily_totals")
+    cursor.execute("""
+        CREATE TABLE daily_totals (
+            date TEXT PRIMARY KEY,
+            total_cents INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO daily_totals (date, total_cents)
+        SELECT date, SUM(amount_cents) FROM expenses GROUP BY date
+    """)
+    cursor.execute("CREATE INDEX idx_expenses_date ON expenses (date)")
+    cursor.execute("CREATE INDEX idx_expenses_date_amount ON expenses (date, amount_cents)")
+    create_daily_totals_triggers(cursor)
+
+
+def create_daily_totals_triggers(cursor):
+    """
+    Keeps daily_totals current on every insert, update and delete of an expense,
+    so no write ever has to re-run SUM over the expenses table.
+    """
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS expenses_daily_total_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO daily_totals (date, total_cents) VALUES (NEW.date, NEW.amount_cents)
+            ON CONFLICT(date) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS expenses_daily_total_update
+        AFTER UPDATE OF date, amount_cents ON expenses
+        BEGIN
+            UPDATE daily_totals SET total_cents = total_cents - OLD.amount_cents WHERE date = OLD.date;
+            INSERT INTO daily_totals (date, total_cents) VALUES (NEW.date, NEW.amount_cents)
+            ON CONFLICT(date) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+            DELETE FROM daily_totals
+            WHERE date = OLD.date AND NOT EXISTS (SELECT 1 FROM expenses WHERE date = OLD.date);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS expenses_daily_total_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            UPDATE daily_totals SET total_cents = total_cents - OLD.amount_cents WHERE date = OLD.date;
+            DELETE FROM daily_totals
+            WHERE date = OLD.date AND NOT EXISTS (SELECT 1 FROM expenses WHERE date = OLD.date);
+        END
+    """)
+
+
+def migrate_v2_to_v3(cursor):
+    """
+    Lets bulk imports skip the per-row daily_totals trigger. While a row
+    exists in bulk_insert_guard (only ever inside the importing transaction)
+    the insert trigger does nothing and the importer updates each date once.
+    """
+    cursor.execute("CREATE TABLE bulk_insert_guard (active INTEGER NOT NULL)")
+    cursor.execute("DROP TRIGGER IF EXISTS expenses_daily_total_insert")
+    cursor.execute("""
+        CREATE TRIGGER expenses_daily_total_insert
+        AFTER INSERT ON expenses
+        WHEN NOT EXISTS (SELECT 1 FROM bulk_insert_guard)
+        BEGIN
+            INSERT INTO daily_totals (date, total_cents) VALUES (NEW.date, NEW.amount_cents)
+            ON CONFLICT(date) DO UPDATE SET total_cents = total_cents + excluded.total_cents;
+        END
+    """)
+
+
+def migrate_v3_to_v4(cursor):
+    """
+    Adds change_counters, bumped on every write to expenses, so readers can
+    cheaply tell whether anything changed since they last looked. Bulk
+    inserts skip the per-row bump and bump the counter once themselves.
+    """
+    cursor.execute("""
+        CREATE TABLE change_counters (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT INTO change_counters (name, version) VALUES ('expenses', 0)")
+    cursor.execute("""
+        CREATE TRIGGER expenses_change_counter_insert
+        AFTER INSERT ON expenses
+        WHEN NOT EXISTS (SELECT 1 FROM bulk_insert_guard)
+        BEGIN
+            UPDATE change_counters SET version = version + 1 WHERE name = 'expenses';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER expenses_change_counter_update
+        AFTER UPDATE ON expenses
+        BEGIN
+            UPDATE change_counters SET version = version + 1 WHERE name = 'expenses';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER expenses_change_counter_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            UPDATE change_counters SET version = version + 1 WHERE name = 'expenses';
+        END
+    """)
+
+
+def migrate_v4_to_v5(cursor):
+    """
+    Adds period_totals, materialized weekly, monthly and yearly rollups of
+    daily_totals. Triggers on daily_totals keep it current, so every expense
+    write updates the rollups with a few primary key lookups.
+    Weeks run Monday to Sunday and are keyed by their Monday.
+    """
+    cursor.execute("""
+        CREATE TABLE period_totals (
+            bucket TEXT NOT NULL,
+            period TEXT NOT NULL,
+            total_cents INTEGER NOT NULL,
+            days INTEGER NOT NULL,
+            PRIMARY KEY (bucket, period)
+        ) WITHOUT ROWID
+    """)
+    periods = {
+        "week": "date({0}, 'weekday 0', '-6 days')",
+        "month": "strftime('%Y-%m', {0})",
+        "year": "strftime('%Y', {0})",
+    }
+    for bucket, period in periods.items():
+        cursor.execute(f"""
+            INSERT INTO period_totals (bucket, period, total_cents, days)
+            SELECT '{bucket}', {period.format('date')}, SUM(total_cents), COUNT(*)
+            FROM daily_totals GROUP BY 2
+        """)
+
+    insert_steps = []
+    update_steps = []
+    delete_steps = []
+    for bucket, period in periods.items():
+        insert_steps.append(f"""
+            INSERT INTO period_totals (bucket, period, total_cents, days)
+            VALUES ('{bucket}', {period.format('NEW.date')}, NEW.total_cents, 1)
+            ON CONFLICT(bucket, period) DO UPDATE SET
+                total_cents = total_cents + excluded.total_cents, days = days + 1;""")
+        update_steps.append(f"""
+            UPDATE period_totals SET total_cents = total_cents + NEW.total_cents - OLD.total_cents
+            WHERE bucket = '{bucket}' AND period = {period.format('NEW.date')};""")
+        delete_steps.append(f"""
+            UPDATE period_totals SET total_cents = total_cents - OLD.total_cents, days = days - 1
+            WHERE bucket = '{bucket}' AND period = {period.format('OLD.date')};""")
+    delete_steps.append("\n            DELETE FROM period_totals WHERE days <= 0;")
+
+    cursor.execute(f"""
+        CREATE TRIGGER daily_totals_rollup_insert
+        AFTER INSERT ON daily_totals
+        BEGIN{''.join(insert_steps)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER daily_totals_rollup_update
+        AFTER UPDATE OF total_cents ON daily_totals
+        BEGIN{''.join(update_steps)}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER daily_totals_rollup_delete
+        AFTER DELETE ON daily_totals
+        BEGIN{''.join(delete_steps)}
+        END
+    """)
+
+
+MIGRATIONS = [
+    migrate_v0_to_v1,
+    migrate_v1_to_v2,
+    migrate_v2_to_v3,
+    migrate_v3_to_v4,
+    migrate_v4_to_v5,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    """
+    Returns the schema version recorded in the database file.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Brings the database up to SCHEMA_VERSION. Each step runs in its own
+    write transaction together with its user_version bump, so an
+    interrupted upgrade leaves the file at the last completed version and
+    other connections only ever see a consistent schema.
+    """
+    previous_isolation = conn.isolation_level
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    try:
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Read the version inside the write lock in case another process just migrated.
+            version = get_schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                cursor.execute("COMMIT")
+                break
+            try:
+                MIGRATIONS[version](cursor)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = previous_isolation
@@ -0,0 +1,184 @@
+import os
+import random
+import threading
+import time
+
+# OCR backends share one interface: recognize(image_data) returns the text of
+# an image, warm_up() gets it ready for the first image (call it after any
+# fork) and version identifies the engine for the OCR cache.
+# handles_preprocessing says whether the backend binarizes and deskews
+# images itself; needs_preprocessing says whether the caller should do it
+# first (see image_preprocessing.prepare_for_ocr).
+#
+# get_backend() picks one from OCR_BACKEND: "fake" (the default), "tesseract"
+# or "http".
+
+# Remote OCR service settings for HttpBackend.
+OCR_REMOTE_URL = os.environ.get("OCR_REMOTE_URL", "http://127.0.0.1:8765/ocr")
+OCR_REMOTE_TIMEOUT = float(os.environ.get("OCR_REMOTE_TIMEOUT", 10))
+OCR_REMOTE_CONCURRENCY = int(os.environ.get("OCR_REMOTE_CONCURRENCY", 8))
+OCR_REMOTE_RETRIES = int(os.environ.get("OCR_REMOTE_RETRIES", 3))
+# Bump when the remote service changes so cached results are recomputed.
+OCR_REMOTE_VERSION = os.environ.get("OCR_REMOTE_VERSION", "remote-1")
+# Responses that are worth retrying; anything else is returned or raised at once.
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Sample receipt text, returned by FakeBackend and the stand-in OCR server.
+SAMPLE_RECEIPT_TEXT = """
+    GROCERY STORE
+    123 Main Street
+    Anytown, USA
+    --------------------
+    Milk                 2.99
+    Bread                3.50
+    Eggs                 4.25
+    Subtotal            10.74
+    Tax                  0.86
+    Total               11.60
+    Credit Card
+    --------------------
+    """
+
+
+class OcrError(Exception):
+    """
+    Raised when a backend could not recognize an image.
+    """
+
+
+class FakeBackend:
+    """
+    Returns fixed text after an optional delay, for tests and offline runs.
+    It never looks at the image, so callers skip preprocessing unless
+    preprocess (OCR_FAKE_PREPROCESS=1) asks for it, e.g. to load test the
+    full pipeline without an OCR engine.
+    """
+    handles_preprocessing = False
+
+    def __init__(self, text=SAMPLE_RECEIPT_TEXT, latency=0.0, preprocess=None):
+        self.text = text
+        self.latency = latency
+        if preprocess is None:
+            preprocess = os.environ.get("OCR_FAKE_PREPROCESS") == "1"
+        self.needs_preprocessing = preprocess
+        self.version = "fake-1"
+
+    def warm_up(self):
+        pass
+
+    def recognize(self, image_data):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.text
+
+
+class TesseractBackend:
+    """
+    Local Tesseract on the warm ocr_engine worker pool, which preprocesses
+    the image itself. With totals_first (OCR_TOTALS_FIRST, on by default)
+    receipts whose total is in the bottom block are only partly recognized,
+    so the returned text may not hold the whole receipt.
+    """
+    handles_preprocessing = True
+    needs_preprocessing = False
+
+    def __init__(self, totals_first=None):
+        import ocr_engine
+
+        self.engine = ocr_engine
+        if totals_first is None:
+            totals_first = os.environ.get("OCR_TOTALS_FIRST", "1") == "1"
+        self.totals_first = totals_first
+        # Partial and full-page texts must not be served from the same cache entries.
+        self.version = ocr_engine.OCR_ENGINE_VERSION + ("-totals-first" if totals_first else "")
+
+    def warm_up(self):
+        self.engine.warm_up()
+
+    def recognize(self, image_data):
+        return self.engine.recognize(image_data, totals_first=self.totals_first)
+
+
+class HttpBackend:
+    """
+    Sends images to a remote OCR service as the raw request body and reads
+    {"text": ...} back. Connections are kept alive in a pooled session, at
+    most max_concurrency requests are in flight at once, and connection
+    errors, timeouts and retryable statuses are retried with jittered
+    exponential backoff.
+    """
+    handles_preprocessing = False
+    needs_preprocessing = True
+
+    def __init__(self, url=None, timeout=None, max_concurrency=None, retries=None,
+                 backoff=0.2, max_backoff=5.0):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.requests = requests
+        self.url = url or OCR_REMOTE_URL
+        self.timeout = timeout or OCR_REMOTE_TIMEOUT
+        self.max_concurrency = max_concurrency or OCR_REMOTE_CONCURRENCY
+        self.retries = OCR_REMOTE_RETRIES if retries is None else retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.version = OCR_REMOTE_VERSION
+
+        # One pooled connection per allowed request, so none is ever opened
+        # and thrown away while another request waits for the pool.
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def warm_up(self):
+        pass
+
+    def recognize(self, image_data):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Full jitter, so clients that failed together don't retry together.
+                time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+            try:
+                with self.slots:
+                    response = self.session.post(
+                        self.url,
+                        data=bytes(image_data),
+                        headers={"Content-Type": "application/octet-stream"},
+                        timeout=self.timeout,
+                    )
+            except (self.requests.ConnectionError, self.requests.Timeout) as e:
+                last_error = e
+                continue
+            if response.status_code in RETRY_STATUS_CODES:
+                last_error = OcrError(f"OCR service answered {response.status_code}")
+                continue
+            if response.status_code != 200:
+                raise OcrError(f"OCR service answered {response.status_code}: {response.text[:200]}")
+            try:
+                return response.json()["text"]
+            except (ValueError, KeyError, TypeError) as e:
+                raise OcrError(f"OCR service sent an invalid response: {e}")
+        raise OcrError(f"OCR service failed after {self.retries + 1} attempts: {last_error}")
+
+    def close(self):
+        self.session.close()
+
+
+BACKENDS = {
+    "fake": FakeBackend,
+    "tesseract": TesseractBackend,
+    "http": HttpBackend,
+}
+
+
+def get_backend(name=None):
+    """
+    Creates the backend named by name, or by the OCR_BACKEND environment variable.
+    """
+    name = name or os.environ.get("OCR_BACKEND", "fake")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,105 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+# Where the cache lives and how big it may grow (size of the stored OCR text).
+CACHE_PATH = os.environ.get("OCR_CACHE_PATH", "ocr_cache.db")
+CACHE_MAX_BYTES = int(os.environ.get("OCR_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+
+
+def image_key(image_data, version):
+    """
+    Returns the cache key for an image read by a given OCR engine version: a
+    hash of both, so every engine keeps its own entry for the same image
+    (the desktop app and the API use different versions but share a cache).
+    """
+    digest = hashlib.sha256(version.encode("utf-8") + b"\0")
+    digest.update(image_data)
+    return digest.hexdigest()
+
+
+def setup_cache(path=None):
+    """
+    Creates the OCR cache table if it does not exist yet.
+    """
+    with sqlite3.connect(path or CACHE_PATH) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used)")
+
+
+def get_cached_text(image_data, version, path=None):
+    """
+    Looks up the OCR text an OCR engine version produced for an image.
+    Returns None on a miss. Entries of other versions are left alone; those
+    no longer used are evicted by size like any other.
+    """
+    key = image_key(image_data, version)
+    try:
+        with sqlite3.connect(path or CACHE_PATH) as conn:
+            row = conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+    except sqlite3.Error as e:
+        print(f"OCR cache error: {e}")
+        return None
+
+
+def store_text(image_data, text, version, path=None, max_bytes=None):
+    """
+    Saves the OCR text for an image and evicts the least recently used
+    entries until the cache is back under its size cap.
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    size = len(text.encode("utf-8"))
+    if size > max_bytes:
+        return
+    try:
+        with sqlite3.connect(path or CACHE_PATH) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, version, text, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (image_key(image_data, version), version, text, size, time.time()),
+            )
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+            if total > max_bytes:
+                evict_lru(conn, total - max_bytes)
+    except sqlite3.Error as e:
+        print(f"OCR cache error: {e}")
+
+
+def evict_lru(conn, bytes_to_free):
+    """
+    Deletes the least recently used entries until at least bytes_to_free are released.
+    """
+    freed = 0
+    stale_keys = []
+    for key, size in conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used ASC"):
+        if freed >= bytes_to_free:
+            break
+        stale_keys.append((key,))
+        freed += size
+    conn.executemany("DELETE FROM ocr_cache WHERE key = ?", stale_keys)
+
+
+def cached_ocr(image_data, ocr_function, version, path=None):
+    """
+    Returns the OCR text for an image, calling ocr_function(image_data) only
+    when the cache has no entry for this image and engine version.
+    """
+    text = get_cached_text(image_data, version, path)
+    if text is None:
+        text = ocr_function(image_data)
+        if text is not None:
+            store_text(image_data, text, version, path)
+    return text
+
@@ -0,0 +1,249 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Local Tesseract OCR behind a small pool of warm worker threads.
+#
+# With the tesserocr binding installed each worker thread loads the language
+# model once into its own TessBaseAPI and recognizes images straight from
+# memory; recognition releases the GIL, so workers run in parallel. Without
+# it the workers fall back to pytesseract, which starts the tesseract
+# executable for every image.
+
+OCR_LANGUAGE = os.environ.get("OCR_LANGUAGE", "eng")
+# Folder holding the traineddata files, or None for Tesseract's default.
+TESSDATA_PATH = os.environ.get("TESSDATA_PREFIX")
+# Path of the tesseract executable for the pytesseract fallback, or None to use PATH.
+TESSERACT_CMD = os.environ.get("TESSERACT_CMD")
+# Bump this whenever the Tesseract install, its settings or the preprocessing
+# change, so cached OCR results are recomputed.
+OCR_ENGINE_VERSION = "tesseract-default-2"
+OCR_ENGINE_WORKERS = int(os.environ.get("OCR_ENGINE_WORKERS", min(4, os.cpu_count() or 1)))
+
+pool = None
+pool_lock = threading.Lock()
+# Each worker thread's TessBaseAPI, created on its first image.
+worker_state = threading.local()
+
+# Totals-first fast path bookkeeping, see recognize_totals_first and fast_path_stats.
+fast_path = {"hits": 0, "misses": 0, "skipped": 0, "roi_seconds": 0.0, "full_pages": 0, "full_seconds": 0.0}
+fast_path_lock = threading.Lock()
+FAST_PATH_COUNTERS = {"hit": "hits", "miss": "misses", "skipped": "skipped"}
+metrics.define("ocr_fast_path_total", "counter",
+               "Totals-first OCR attempts: hit (total found in the region), miss (fell back to the full page) "
+               "or skipped (too few lines to crop).")
+metrics.define("ocr_phase_seconds", "histogram", "Tesseract time for the totals region (roi) and for full pages (full).")
+
+
+def reset_after_fork():
+    """
+    Forgets the parent's pool in a forked child: its worker threads do not
+    exist there, so the child starts its own on first use.
+    """
+    global pool, pool_lock, worker_state, fast_path_lock
+    pool = None
+    pool_lock = threading.Lock()
+    worker_state = threading.local()
+    fast_path_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def set_tesseract_cmd(path):
+    """
+    Points the pytesseract fallback at a tesseract executable.
+    """
+    global TESSERACT_CMD
+    TESSERACT_CMD = path
+
+
+def get_pool():
+    """
+    Returns the shared OCR worker pool, starting it on first use.
+    """
+    global pool
+    with pool_lock:
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=OCR_ENGINE_WORKERS, thread_name_prefix="ocr-engine")
+        return pool
+
+
+def shutdown_pool():
+    """
+    Stops the worker threads. The next recognize() call starts a new pool.
+    """
+    global pool
+    with pool_lock:
+        if pool is not None:
+            pool.shutdown(wait=True)
+            pool = None
+
+
+def recognize(image_data, preprocess=True, totals_first=False):
+    """
+    Returns the text in an image, given as bytes or any bytes-like buffer.
+    Runs on a pool worker and blocks until it is done; safe to call from
+    any thread. The image is read in place, so the buffer must stay valid
+    until this returns.
+
+    With totals_first only the totals block at the bottom of the receipt is
+    recognized when it holds a keyword total; see recognize_totals_first.
+    """
+    return get_pool().submit(recognize_in_worker, image_data, preprocess, totals_first).result()
+
+
+def recognize_in_worker(image_data, preprocess, totals_first=False):
+    """
+    Decodes, optionally preprocesses and recognizes one image on the current
+    worker thread.
+    """
+    if preprocess:
+        from image_preprocessing import preprocess_image
+
+        image, timings = preprocess_image(image_data)
+    else:
+        from PIL import Image
+        from uploads import BufferReader
+
+        with BufferReader(image_data) as reader:
+            image = Image.open(reader)
+            image.load()
+
+    if totals_first:
+        return recognize_totals_first(image)
+    return ocr_image(image)
+
+
+def recognize_totals_first(image):
+    """
+    Two-phase OCR. Text lines are located from the ink profile, and only the
+    lower part of the receipt is recognized first. If the receipt parser
+    finds a keyword total ("Total", "Balance due", ...) in it, that text is
+    returned. Because the region runs to the last line, this is the same
+    keyword total a full-page read would pick. Otherwise the whole page is
+    recognized.
+    """
+    from image_preprocessing import crop_totals_region
+    from receipt_parser import find_total
+
+    region = crop_totals_region(image.convert("L"))
+    if region is None:
+        record_fast_path("skipped")
+        return ocr_full_page(image)
+
+    started = time.perf_counter()
+    text = ocr_image(region)
+    elapsed = time.perf_counter() - started
+    metrics.observe("ocr_phase_seconds", elapsed, phase="roi")
+    total, line, source = find_total(text)
+    if source == "keyword":
+        record_fast_path("hit", elapsed)
+        return text
+
+    record_fast_path("miss", elapsed)
+    return ocr_full_page(image)
+
+
+def ocr_full_page(image):
+    """
+    Recognizes a whole page and records its time for fast_path_stats.
+    """
+    started = time.perf_counter()
+    text = ocr_image(image)
+    elapsed = time.perf_counter() - started
+    metrics.observe("ocr_phase_seconds", elapsed, phase="full")
+    with fast_path_lock:
+        fast_path["full_pages"] += 1
+        fast_path["full_seconds"] += elapsed
+    return text
+
+
+def record_fast_path(result, roi_seconds=0.0):
+    """
+    Counts one totals-first attempt: "hit", "miss" or "skipped".
+    """
+    metrics.increment("ocr_fast_path_total", result=result)
+    with fast_path_lock:
+        fast_path[FAST_PATH_COUNTERS[result]] += 1
+        fast_path["roi_seconds"] += roi_seconds
+
+
+def fast_path_stats():
+    """
+    Summarizes the totals-first fast path: how often the totals region was
+    enough (hit_rate), the mean time of a region read and of a full page,
+    and the OCR time saved overall. Savings are estimated as hits times the
+    mean full-page time, minus all time spent on regions, including the
+    regions that missed.
+    """
+    with fast_path_lock:
+        stats = dict(fast_path)
+    attempts = stats["hits"] + stats["misses"]
+    mean_full = stats["full_seconds"] / stats["full_pages"] if stats["full_pages"] else None
+    stats["hit_rate"] = round(stats["hits"] / attempts, 3) if attempts else None
+    stats["mean_roi_seconds"] = round(stats["roi_seconds"] / attempts, 4) if attempts else None
+    stats["mean_full_seconds"] = round(mean_full, 4) if mean_full is not None else None
+    stats["seconds_saved"] = (
+        round(stats["hits"] * mean_full - stats["roi_seconds"], 3) if mean_full is not None else None
+    )
+    stats["roi_seconds"] = round(stats["roi_seconds"], 3)
+    stats["full_seconds"] = round(stats["full_seconds"], 3)
+    return stats
+
+
+def ocr_image(image):
+    """
+    Recognizes a PIL image with this worker's Tesseract.
+    """
+    api = get_worker_api()
+    if api is None:
+        import pytesseract
+
+        if TESSERACT_CMD:
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        return pytesseract.image_to_string(image, lang=OCR_LANGUAGE)
+
+    api.SetImage(image)
+    return api.GetUTF8Text()
+
+
+def get_worker_api():
+    """
+    Returns this worker thread's TessBaseAPI, loading the model the first
+    time. Returns None when tesserocr is not installed.
+    """
+    if not hasattr(worker_state, "api"):
+        try:
+            import tesserocr
+        except ImportError:
+            worker_state.api = None
+        else:
+            if TESSDATA_PATH:
+                worker_state.api = tesserocr.PyTessBaseAPI(path=TESSDATA_PATH, lang=OCR_LANGUAGE)
+            else:
+                worker_state.api = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE)
+    return worker_state.api
+
+
+def warm_up():
+    """
+    Starts every worker and loads its model now instead of on the first
+    receipt. Returns the number of workers that loaded a model.
+    """
+    executor = get_pool()
+    barrier = threading.Barrier(OCR_ENGINE_WORKERS)
+
+    def load():
+        # The barrier makes each task land on a different worker thread.
+        try:
+            return get_worker_api() is not None
+        finally:
+            barrier.wait(timeout=60)
+
+    futures = [executor.submit(load) for _ in range(OCR_ENGINE_WORKERS)]
+    return sum(future.result() for future in futures)
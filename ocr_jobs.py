@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# SQLite file that holds the job queue, and how many worker threads drain it.
+JOBS_PATH = os.environ.get("OCR_JOBS_PATH", "ocr_jobs.db")
+JOB_WORKERS = int(os.environ.get("OCR_JOB_WORKERS", 2))
+# Finished jobs older than this (in seconds) are removed by the workers.
+JOB_RETENTION = int(os.environ.get("OCR_JOB_RETENTION", 24 * 60 * 60))
+# Running jobs whose start is older than this (in seconds) are taken to
+# belong to a worker that died and are queued again. Several server
+# processes share the queue, so a job one of them is still running must
+# not be reclaimed when another starts; keep this well above the slowest OCR.
+JOB_LEASE = int(os.environ.get("OCR_JOB_LEASE", 10 * 60))
+
+job_available = threading.Condition()
+worker_threads = []
+
+
+def connect(path=None):
+    """
+    Opens a connection to the job database. Rows come back as sqlite3.Row.
+    """
+    conn = sqlite3.connect(path or JOBS_PATH, timeout=10)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def setup_jobs(path=None):
+    """
+    Creates the jobs table and puts jobs whose worker stopped while
+    running them back in the queue.
+    """
+    with connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                payload BLOB,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created)")
+    reclaim_stale_jobs(path)
+
+
+def reclaim_stale_jobs(path=None):
+    """
+    Queues running jobs again once their lease (JOB_LEASE) has run out.
+    """
+    with connect(path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running' AND started < ?",
+            (time.time() - JOB_LEASE,),
+        )
+
+
+def submit_job(payload, path=None):
+    """
+    Adds a job to the queue and wakes up a worker. Returns the new job id.
+    """
+    job_id = uuid.uuid4().hex
+    with connect(path) as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, status, payload, created) VALUES (?, 'queued', ?, ?)",
+            (job_id, payload, time.time()),
+        )
+    with job_available:
+        job_available.notify()
+    return job_id
+
+
+def get_job(job_id, path=None):
+    """
+    Returns the public view of a job as a dict, or None if the id is unknown.
+    """
+    with connect(path) as conn:
+        row = conn.execute(
+            "SELECT id, status, result, error, created, started, finished FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+    if row is None:
+        return None
+
+    job = {
+        "id": row["id"],
+        "status": row["status"],
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "error": row["error"],
+        "queued_seconds": None,
+        "run_seconds": None,
+    }
+    if row["started"] is not None:
+        job["queued_seconds"] = round(row["started"] - row["created"], 4)
+    if row["finished"] is not None:
+        job["run_seconds"] = round(row["finished"] - row["started"], 4)
+    return job
+
+
+def claim_job(path=None):
+    """
+    Atomically takes the oldest queued job and marks it as running.
+    Returns (job_id, payload), or None when the queue is empty.
+    """
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+        ).fetchone()
+        if row is None:
+            conn.rollback()
+            return None
+        conn.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"]))
+        conn.commit()
+        return row["id"], row["payload"]
+    finally:
+        conn.close()
+
+
+def finish_job(job_id, result=None, error=None, path=None):
+    """
+    Stores the outcome of a job and drops its payload, which is no longer needed.
+    """
+    status = "failed" if error is not None else "done"
+    with connect(path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, payload = NULL WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+
+def purge_old_jobs(path=None):
+    """
+    Deletes finished jobs that are older than JOB_RETENTION.
+    """
+    with connect(path) as conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?",
+            (time.time() - JOB_RETENTION,),
+        )
+
+
+def queue_stats(path=None, window=100):
+    """
+    Returns the queue depth and latency figures for the last `window` finished jobs.
+    """
+    with connect(path) as conn:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        rows = conn.execute(
+            "SELECT started - created, finished - created FROM jobs "
+            "WHERE finished IS NOT NULL ORDER BY finished DESC LIMIT ?",
+            (window,),
+        ).fetchall()
+
+    waits = sorted(row[0] for row in rows)
+    totals = sorted(row[1] for row in rows)
+    return {
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "done": counts.get("done", 0),
+        "failed": counts.get("failed", 0),
+        "workers": len(worker_threads),
+        "wait_p50": percentile(waits, 50),
+        "latency_p50": percentile(totals, 50),
+        "latency_p99": percentile(totals, 99),
+    }
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list. Returns None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    index = max(0, int(round(pct / 100 * len(sorted_values))) - 1)
+    return round(sorted_values[index], 4)
+
+
+def worker_loop(handler, path=None, poll_interval=1.0):
+    """
+    Runs jobs forever. handler(payload) returns the job result; any
+    exception it raises is stored as the job error.
+    """
+    last_purge = 0
+    while True:
+        claimed = claim_job(path)
+        if claimed is None:
+            if time.time() - last_purge > 60:
+                purge_old_jobs(path)
+                reclaim_stale_jobs(path)
+                last_purge = time.time()
+            with job_available:
+                job_available.wait(timeout=poll_interval)
+            continue
+
+        job_id, payload = claimed
+        try:
+            result = handler(payload)
+        except Exception as e:
+            finish_job(job_id, error=str(e), path=path)
+        else:
+            finish_job(job_id, result=result, path=path)
+
+
+def start_workers(handler, count=None, path=None):
+    """
+    Starts the background worker threads once. Later calls do nothing.
+    """
+    with job_available:
+        if worker_threads:
+            return
+        setup_jobs(path)
+        for i in range(count or JOB_WORKERS):
+            thread = threading.Thread(
+                target=worker_loop, args=(handler, path), name=f"ocr-job-worker-{i}", daemon=True
+            )
+            thread.start()
+            worker_threads.append(thread)
@@ -0,0 +1,200 @@
+import collections
+import cProfile
+import hmac
+import io
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+# Opt-in request profiling for the Flask API. Everything is off unless
+# ADMIN_TOKEN is set. Then a PROFILE_SAMPLE_RATE share of requests is
+# profiled, as well as any request that sends the token in X-Admin-Token
+# together with X-Profile: sample or X-Profile: cprofile. The last
+# PROFILE_KEEP profiles are kept in memory for the admin endpoints.
+#
+# "sample" profiles are stack samples of the request thread, taken every
+# PROFILE_SAMPLE_INTERVAL seconds, and export as collapsed stacks for
+# flamegraph tools; work handed to the OCR pool shows up as time spent
+# waiting on its result. "cprofile" profiles trace every call and export as
+# pstats. Before Python 3.12 cProfile traces only the thread that enabled it,
+# like the sampler. From 3.12 on it is built on sys.monitoring, which is
+# process-wide, so the profile also holds OCR pool threads and any requests
+# that ran at the same time; use "sample" to isolate one request.
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", 0.005))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))
+PROFILE_MODES = ("sample", "cprofile")
+
+profiles = collections.deque(maxlen=PROFILE_KEEP)
+profiles_lock = threading.Lock()
+next_profile_id = 1
+# Only one cProfile tracer can run at a time.
+cprofile_lock = threading.Lock()
+
+
+def is_admin(headers):
+    """
+    Returns True if the request headers carry the admin token.
+    """
+    token = headers.get("X-Admin-Token")
+    return ADMIN_TOKEN is not None and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread from a background thread and counts
+    each distinct stack, root first.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+
+def start_request(headers):
+    """
+    Decides whether to profile the current request and starts the profiler.
+    Returns a session to pass to finish_request, or None.
+    """
+    if ADMIN_TOKEN is None:
+        return None
+    mode = headers.get("X-Profile")
+    if mode is not None and is_admin(headers):
+        if mode not in PROFILE_MODES:
+            mode = PROFILE_MODE
+    elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        mode = PROFILE_MODE
+    else:
+        return None
+
+    session = {"mode": mode, "started": time.time(), "clock": time.perf_counter()}
+    if mode == "cprofile":
+        if not cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) is already active.
+            cprofile_lock.release()
+            return None
+        session["profiler"] = profiler
+    else:
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL)
+        sampler.start()
+        session["sampler"] = sampler
+    return session
+
+
+def finish_request(session, method, path, status):
+    """
+    Stops the profiler of a request and stores the profile in the ring buffer.
+    """
+    global next_profile_id
+    duration = time.perf_counter() - session["clock"]
+    record = {
+        "method": method,
+        "path": path,
+        "status": status,
+        "mode": session["mode"],
+        "started": session["started"],
+        "duration_ms": round(duration * 1000, 2),
+    }
+    if session["mode"] == "cprofile":
+        profiler = session["profiler"]
+        profiler.disable()
+        cprofile_lock.release()
+        profiler.create_stats()
+        record["stats"] = profiler.stats
+    else:
+        sampler = session["sampler"]
+        sampler.stop()
+        record["stacks"] = sampler.stacks
+        record["samples"] = sampler.samples
+
+    with profiles_lock:
+        record["id"] = next_profile_id
+        next_profile_id += 1
+        profiles.append(record)
+
+
+def list_profiles():
+    """
+    Returns a summary of every stored profile, newest first.
+    """
+    with profiles_lock:
+        records = list(profiles)
+    summary_keys = ("id", "method", "path", "status", "mode", "started", "duration_ms", "samples")
+    return [{key: record.get(key) for key in summary_keys} for record in reversed(records)]
+
+
+def get_profile(profile_id):
+    with profiles_lock:
+        for record in profiles:
+            if record["id"] == profile_id:
+                return record
+    return None
+
+
+def format_pstats(record):
+    """
+    Returns a cProfile profile as a pstats file, loadable with
+    pstats.Stats(path) or tools like snakeviz.
+    """
+    return marshal.dumps(record["stats"])
+
+
+def format_text(record, limit=40):
+    """
+    Returns a readable report: the top functions by cumulative time for
+    cProfile profiles, or the most frequent stacks for sampled ones.
+    """
+    if record["mode"] == "cprofile":
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = record["stats"]
+        stats.get_top_level_stats()
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+    lines = [f"{record['samples']} samples every {PROFILE_SAMPLE_INTERVAL * 1000:g} ms"]
+    lines += [f"{count:6d}  {stack}" for stack, count in record["stacks"].most_common(limit)]
+    return "\n".join(lines) + "\n"
+
+
+def format_collapsed(record):
+    """
+    Returns a sampled profile as collapsed stacks ("root;child;leaf count"
+    per line), the input format of flamegraph.pl, speedscope and inferno.
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in record["stacks"].items())
@@ -0,0 +1,85 @@
+import re
+
+# One combined pattern, compiled once. Each match is a keyword-anchored amount
+# ("Total: 11.60"), a currency-anchored amount ("RM 11.60"), a two-decimal
+# number or a plain number; match.lastgroup tells them apart. The leading
+# lookahead lets the engine skip spaces and punctuation without trying every branch.
+#
+# The keyword branch keeps the old API anchor: the amount must follow the
+# keyword directly, with at most a ":" or "-" and a currency in between, so
+# lines like "Total items: 3" or "Total Savings 2.00" are not read as totals.
+# Like the old API it also matches keywords inside words ("Subtotal").
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?=[gtbaspcmru$€\d])
+    (?:
+        (?:grand\s*total|total\s*due|balance\s*due|amount\s*paid|total|sum|price|charge)
+            \s*[:\-]?\s*(?:RM|MYR|S\$|SGD|USD|\$|€)?\s*
+            (?P<keyword>\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\d+(?:\.\d{2})?)
+        | (?:\b(?:RM|MYR|S\$|SGD|USD)|\$|€)
+            \s*
+            (?P<currency>\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\d+(?:\.\d{2})?)
+        | \b(?:(?P<decimal>\d+\.\d{2})|(?P<number>\d+(?:\.\d+)?))\b
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def find_total(text):
+    """
+    Finds the receipt total in a single pass over the OCR text.
+    Returns (total, line, source), where line is the text line the amount
+    came from and source is "keyword", "currency", "decimal" or "number",
+    or (None, None, None) when the text has no usable amount.
+
+    The last keyword-anchored amount wins; otherwise the largest
+    currency-anchored amount, then the largest two-decimal number, then
+    the largest number above 1.
+    """
+    if not text:
+        return None, None, None
+
+    # Matches are only bucketed during the scan; floats are computed for
+    # the winning bucket alone, so a receipt with a "Total" line converts one number.
+    last_keyword = None
+    buckets = {"currency": [], "decimal": [], "number": []}
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "keyword":
+            last_keyword = match
+        else:
+            buckets[kind].append(match)
+
+    if last_keyword is not None:
+        return amount(last_keyword, "keyword"), line_at(text, last_keyword.start()), "keyword"
+
+    # Currency amounts also count as two-decimal numbers for the fallback.
+    buckets["decimal"].extend(buckets["currency"])
+    for source in ("currency", "decimal", "number"):
+        candidates = [(amount(match, source), match.start()) for match in buckets[source]]
+        if source == "number":
+            candidates = [candidate for candidate in candidates if candidate[0] > 1.0]
+        if candidates:
+            value, position = max(candidates)
+            return value, line_at(text, position), source
+    return None, None, None
+
+
+def amount(match, group):
+    """
+    Converts the amount captured by a match to a float.
+    """
+    value = match.group(group) or match.group("currency")
+    return float(value.replace(",", ""))
+
+
+def line_at(text, position):
+    """
+    Returns the stripped line of text that contains the given offset.
+    """
+    start = text.rfind("\n", 0, position) + 1
+    end = text.find("\n", position)
+    if end == -1:
+        end = len(text)
+    return text[start:end].strip()
@@ -0,0 +1,167 @@
+import io
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Largest receipt image accepted, and how much of it is buffered in memory
+# before the rest is spooled to a temporary file.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+SPOOL_MEMORY_BYTES = int(os.environ.get("SPOOL_MEMORY_BYTES", 1024 * 1024))
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """
+    Raised when an upload is bigger than the allowed size.
+    """
+
+
+@contextmanager
+def spool_upload(stream, max_bytes=None, memory_bytes=None):
+    """
+    Reads an upload stream in chunks and yields its contents as a read-only
+    memoryview, without ever joining the chunks into one bytes object.
+    Small uploads stay in memory; larger ones are spooled to a temporary file
+    that is memory-mapped, so the view is backed by the page cache.
+    Raises UploadTooLarge as soon as more than max_bytes have been read.
+    The view is only valid inside the with block.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    memory_bytes = SPOOL_MEMORY_BYTES if memory_bytes is None else memory_bytes
+
+    buffer = bytearray()
+    spool_file = None
+    mapped = None
+    view = None
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+            if spool_file is None and size > memory_bytes:
+                spool_file = tempfile.TemporaryFile()
+                spool_file.write(buffer)
+                buffer = None
+            if spool_file is None:
+                buffer += chunk
+            else:
+                spool_file.write(chunk)
+
+        if spool_file is None:
+            view = memoryview(buffer).toreadonly()
+        else:
+            spool_file.flush()
+            mapped = mmap.mmap(spool_file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+        yield view
+    finally:
+        if view is not None:
+            view.release()
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # A consumer still holds a view; the map is freed with it.
+                pass
+        if spool_file is not None:
+            spool_file.close()
+
+
+@contextmanager
+def upload_view(stream, max_bytes=None):
+    """
+    Yields a read-only memoryview of an upload that werkzeug has already
+    buffered while parsing the form, without copying it a second time.
+    Werkzeug keeps small files in memory, which are viewed directly, and
+    spools larger ones to a temporary file, which is memory-mapped. Other
+    streams are read with spool_upload. Raises UploadTooLarge if the upload
+    is larger than max_bytes. The view is only valid inside the with block.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+
+    # A SpooledTemporaryFile holds its BytesIO or temporary file in _file;
+    # asking it for a fileno() would write an in-memory file out to disk.
+    target = getattr(stream, "_file", stream)
+    if isinstance(target, io.BytesIO):
+        with target.getbuffer() as buffer:
+            if len(buffer) > max_bytes:
+                raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+            with buffer.toreadonly() as view:
+                yield view
+        return
+
+    try:
+        fileno = target.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        with spool_upload(stream, max_bytes) as view:
+            yield view
+        return
+
+    target.flush()
+    size = os.fstat(fileno).st_size
+    if size > max_bytes:
+        raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+    if size == 0:
+        # An empty file cannot be mapped.
+        yield memoryview(b"")
+        return
+
+    mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # A consumer still holds a view; the map is freed with it.
+            pass
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A seekable, read-only file object over a bytes-like buffer that does not
+    copy it, unlike io.BytesIO(memoryview). Lets PIL decode straight from an
+    upload buffer.
+    """
+
+    def __init__(self, data):
+        self.view = memoryview(data).cast("B")
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        count = min(len(target), len(self.view) - self.position)
+        if count <= 0:
+            return 0
+        target[:count] = self.view[self.position:self.position + count]
+        self.position += count
+        return count
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = len(self.view) + offset
+        self.position = max(0, self.position)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        self.view.release()
+        super().close()
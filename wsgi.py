@@ -0,0 +1,25 @@
+"""
+WSGI entry point for running the receipt API under a production server,
+e.g. gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import io
+
+from PIL import Image
+
+from API import app
+from image_preprocessing import preprocess_image
+from receipt_parser import find_total
+
+
+def warm_up():
+    """
+    Exercises the parser and image pipeline once so the first real request
+    doesn't pay for lazy initialisation (regex compilation, PIL plugins, NumPy).
+    """
+    find_total("Total 1.00")
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    preprocess_image(buffer.getvalue())
+
+
+warm_up()